@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos planos de consulta do PM2 Log Viewer (log_query.py).
+Para cada consulta, percorre o arquivo como o servidor faz (de trás para
+frente, ou pelo índice de níveis) e compara o tempo de até três planos
+(o ganho é relativo ao primeiro):
+  legado      filtro anterior à linguagem de consulta (apenas search/start/end)
+  sem plano   predicados na ordem escrita, sem pré-filtros nem índice para q=
+  planejado   plano otimizado por compile_plan()
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+
+from log_index import get_level_index
+from log_query import compile_plan
+from log_stream import LogStream
+from log_time import extract_timestamp_from_line
+
+# (q, search, minutos finais cobertos por start=), como nas requisições a /file/
+DEFAULT_QUERIES = (
+    ('', 'timeout', None),
+    ('timeout', '', None),
+    ('timeout AND NOT healthcheck', '', None),
+    ('NOT healthcheck AND timeout', '', None),
+    ('/user_id=\\d+/', '', None),
+    ('/\\d+ took \\d{4,}ms/', '', None),
+    ('/[0-9a-f]{16} from queue/', '', None),
+    ('level:ERROR OR level:FATAL', '', None),
+    ('level:INFO timeout', '', None),
+    ('', 'timeout', 30),
+    ('/\\d+ took \\d{4,}ms/', '', 30),
+)
+
+
+def generate_log(path, lines, seed=0):
+    """Gera um log sintético no formato do PM2, com um dia de linhas."""
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    step = 86400 / lines
+    levels = ('INFO',) * 12 + ('HTTP',) * 4 + ('DEBUG', 'DEBUG', 'WARN', 'ERROR')
+    with open(path, 'w') as f:
+        for number in range(lines):
+            timestamp = (start + timedelta(seconds=number * step)).strftime('%d-%m-%Y %H:%M:%S')
+            level = rng.choice(levels)
+            roll = rng.random()
+            if level == 'HTTP' or roll < 0.3:
+                message = f"GET /healthcheck 200 {rng.randint(1, 20)}ms"
+            elif level == 'ERROR' and roll < 0.6:
+                message = f"upstream timeout after {rng.randint(100, 5000)}ms"
+            elif roll < 0.7:
+                message = f"user_id={rng.randint(1, 99999)} took {rng.randint(1, 3000)}ms"
+            else:
+                message = f"processed job {rng.getrandbits(64):016x} from queue default"
+            if rng.random() < 0.0005:
+                level = 'FATAL'
+            f.write(f"0|api      | [{timestamp}] {level} {message}\n")
+
+
+def legacy_matches(search, start_time, end_time):
+    """Filtro anterior à linguagem de consulta: decodifica, busca e extrai o timestamp de toda linha."""
+    def matches(raw_line):
+        line = raw_line.decode('utf-8', errors='ignore')
+        if search and search not in line.lower():
+            return False
+        if start_time or end_time:
+            line_timestamp = extract_timestamp_from_line(line)
+            if not line_timestamp:
+                return False
+            if start_time and line_timestamp < start_time:
+                return False
+            if end_time and line_timestamp > end_time:
+                return False
+        return True
+    return matches
+
+
+def run_plan(path, levels, matches, start_time):
+    """Percorre o arquivo como _process_file_lines, sem limite de resultados. Retorna (segundos, resultados)."""
+    stream = LogStream(path)
+    if levels:
+        lines = stream.iter_level_lines(levels, True, None, start_time, extract_timestamp_from_line)
+    else:
+        lines = stream.iter_lines_backward(None, start_time, extract_timestamp_from_line)
+    started = time.perf_counter()
+    count = 0
+    for _, _, raw_line in lines:
+        if matches(raw_line):
+            count += 1
+    return time.perf_counter() - started, count
+
+
+def last_timestamp(path):
+    """Timestamp da última linha do arquivo, base dos intervalos de tempo do benchmark."""
+    stream = LogStream(path)
+    for _, _, raw_line in stream.iter_lines_backward():
+        timestamp = extract_timestamp_from_line(raw_line.decode('utf-8', errors='ignore'))
+        if timestamp:
+            return timestamp
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compara os planos de consulta do PM2 Log Viewer',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos:
+  %(prog)s                                   # Log sintético de 200.000 linhas
+  %(prog)s -f /app/logs/api-out.log          # Log real
+  %(prog)s -f api-out.log -q 'timeout AND NOT healthcheck' -q '/user_id=\\d+/'
+        """
+    )
+    parser.add_argument('-f', '--file', help='Arquivo de log (padrão: gera um log sintético)')
+    parser.add_argument('-n', '--lines', type=int, default=200000, help='Linhas do log sintético (padrão: %(default)s)')
+    parser.add_argument('-q', '--query', action='append', help='Consulta q= a comparar (pode repetir)')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Execuções por plano; mostra a mediana (padrão: %(default)s)')
+    args = parser.parse_args()
+
+    temp_dir = None
+    path = args.file
+    if not path:
+        temp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(temp_dir.name, 'bench-out.log')
+        print(f"Gerando log sintético com {args.lines} linhas...")
+        generate_log(path, args.lines)
+
+    # Aquecer o cache de páginas e construir o índice de níveis antes de medir,
+    # para que a primeira execução dos planos com níveis não inclua a indexação
+    run_plan(path, (), lambda raw_line: True, None)
+    for segment in LogStream(path).segments:
+        get_level_index(segment.path)
+    end_of_log = last_timestamp(path)
+
+    queries = [(query, '', None) for query in args.query] if args.query else DEFAULT_QUERIES
+
+    print(f"\nArquivo: {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB)\n")
+    print(f"{'Consulta':<44} {'Plano':<10} {'ms':>9} {'ganho':>9} {'Resultados':>10}")
+    print("=" * 86)
+
+    mismatches = 0
+    for query, search, minutes in queries:
+        start_time = end_of_log - timedelta(minutes=minutes) if minutes and end_of_log else None
+        label = ' '.join(filter(None, [f"q={query}" if query else '', f"search={search}" if search else '',
+                                      f"últimos {minutes} min" if minutes else '']))
+
+        variants = []
+        if not query:
+            variants.append(('legado', (), legacy_matches(search, start_time, None), None))
+        try:
+            for name, planned in (('sem plano', False), ('planejado', True)):
+                plan = compile_plan(query, search, start_time, None, (), planned=planned)
+                variants.append((name, plan.levels, plan.matches, plan))
+        except ValueError as e:
+            print(f"{label:<44} erro: {e}")
+            continue
+
+        baseline = None
+        counts = set()
+        for name, levels, matches, plan in variants:
+            timings = []
+            for _ in range(args.repeat):
+                elapsed, count = run_plan(path, levels, matches, start_time)
+                timings.append(elapsed)
+            counts.add(count)
+            median = statistics.median(timings)
+            baseline = baseline or median
+            print(f"{label:<44.44} {name:<10} {median * 1000:>9.1f} {baseline / median:>8.2f}x {count:>10}")
+            label = ''
+        print(f"{'':<44} plano: {plan.describe()}")
+        if len(counts) > 1:
+            mismatches += 1
+            print(f"{'':<44} ✗ os planos retornaram resultados diferentes: {sorted(counts)}")
+        print()
+
+    if temp_dir:
+        temp_dir.cleanup()
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
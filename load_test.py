@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Gerador de carga para o PM2 Log Viewer.
+Simula várias abas abertas com auto-refresh: cada visitante faz login em
+/api/login e repete uma mistura de consultas (/files, tail, busca, intervalo
+de tempo e /api/auth-status), enquanto o arquivo de log alvo continua
+crescendo. Ao final, mostra latências p50/p95/p99, taxa de erros e o uso de
+memória (RSS) do servidor ao longo do teste.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+# Mistura padrão de consultas (tipo=peso), parecida com o uso da interface
+DEFAULT_MIX = 'tail=50,search=20,range=15,files=10,auth=5'
+SCENARIOS = ('tail', 'search', 'range', 'files', 'auth')
+SEARCH_TERMS = ('timeout', 'user', 'error', 'healthcheck', 'nao-existe')
+LEVELS = ('INFO', 'INFO', 'INFO', 'INFO', 'WARN', 'ERROR', 'DEBUG')
+PERCENTILES = (50, 95, 99)
+
+
+def parse_mix(value):
+    """Converte 'tail=50,search=20' em uma lista de (cenário, peso)."""
+    mix = []
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Cenário desconhecido: {name}")
+        try:
+            mix.append((name, float(weight)))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Peso inválido para {name}: {weight}")
+    if not any(weight > 0 for _, weight in mix):
+        raise argparse.ArgumentTypeError("A mistura precisa de pelo menos um peso positivo")
+    return mix
+
+
+def percentile(sorted_values, percent):
+    """Percentil pelo método nearest-rank de uma lista já ordenada."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def percentile_ms(sorted_values, percent):
+    """Percentil em milissegundos de latências em segundos, ou None."""
+    value = percentile(sorted_values, percent)
+    return None if value is None else round(value * 1000, 2)
+
+
+def read_rss(pid):
+    """RSS do processo em KB, lido de /proc/<pid>/status, ou None."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class Stats:
+    """Latências e erros coletados pelos visitantes, por cenário."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {name: [] for name in SCENARIOS}
+        self.errors = {name: 0 for name in SCENARIOS}
+        self.error_samples = {}
+        self.bytes = 0
+        self.window = []
+
+    def record(self, scenario, latency, size, error=None):
+        with self.lock:
+            self.latencies[scenario].append(latency)
+            self.window.append(latency)
+            self.bytes += size
+            if error:
+                self.errors[scenario] += 1
+                self.error_samples.setdefault(error, 0)
+                self.error_samples[error] += 1
+
+    def take_window(self):
+        """Retorna e zera as latências do último intervalo de amostragem."""
+        with self.lock:
+            window, self.window = self.window, []
+        return sorted(window)
+
+
+class Viewer(threading.Thread):
+    """Uma aba do navegador com auto-refresh, com sessão e cookies próprios."""
+
+    def __init__(self, number, args, stats, stop_event):
+        super().__init__(daemon=True)
+        self.number = number
+        self.args = args
+        self.stats = stats
+        self.stop_event = stop_event
+        self.random = random.Random(args.seed + number)
+        self.opener = build_opener(HTTPCookieProcessor(CookieJar()))
+        self.scenarios = [name for name, _ in args.mix]
+        self.weights = [weight for _, weight in args.mix]
+        self.login_error = None
+
+    def request(self, path, data=None):
+        """Faz a requisição e retorna (status, corpo)."""
+        headers = {'Content-Type': 'application/json'} if data is not None else {}
+        request = Request(self.args.url + path, data=data, headers=headers)
+        try:
+            with self.opener.open(request, timeout=self.args.timeout) as response:
+                return response.status, response.read()
+        except HTTPError as e:
+            return e.code, e.read()
+
+    def login(self):
+        """Faz login se a autenticação estiver habilitada no servidor."""
+        _, body = self.request('/api/auth-status')
+        if not json.loads(body).get('enabled'):
+            return True
+        credentials = json.dumps({'username': self.args.username, 'password': self.args.password})
+        status, body = self.request('/api/login', credentials.encode())
+        if status != 200:
+            self.login_error = f"HTTP {status}: {body.decode(errors='replace')}"
+            return False
+        return True
+
+    def build_path(self, scenario):
+        """Monta a URL de uma consulta do cenário, como a interface faria."""
+        if scenario == 'files':
+            return '/files'
+        if scenario == 'auth':
+            return '/api/auth-status'
+
+        params = {'limit': self.args.limit}
+        if self.args.format != 'json':
+            params['format'] = self.args.format
+        if scenario == 'search':
+            params['search'] = self.random.choice(SEARCH_TERMS)
+        elif scenario == 'range':
+            # Últimos minutos, no formato do campo datetime-local da interface
+            end = datetime.now()
+            start = end - timedelta(minutes=self.args.range_minutes)
+            params['start'] = start.strftime('%Y-%m-%dT%H:%M')
+            params['end'] = end.strftime('%Y-%m-%dT%H:%M')
+        return f"/file/{self.args.file}?{urlencode(params)}"
+
+    def run(self):
+        # Abas não abrem todas no mesmo instante
+        if self.stop_event.wait(self.random.uniform(0, self.args.interval)):
+            return
+        try:
+            if not self.login():
+                return
+        except (URLError, OSError, ValueError) as e:
+            self.login_error = str(e)
+            return
+
+        while not self.stop_event.is_set():
+            scenario = self.random.choices(self.scenarios, self.weights)[0]
+            path = self.build_path(scenario)
+            started = time.perf_counter()
+            try:
+                status, body = self.request(path)
+                error = f"HTTP {status}" if status >= 400 else None
+                size = len(body)
+            except (URLError, OSError) as e:
+                error = type(e).__name__ if not isinstance(e, URLError) else f"URLError: {e.reason}"
+                size = 0
+            self.stats.record(scenario, time.perf_counter() - started, size, error)
+            self.stop_event.wait(self.args.interval)
+
+
+class LogWriter(threading.Thread):
+    """
+    Acrescenta linhas de log ao arquivo alvo (já aberto), `rate` linhas por
+    segundo. `lines` conta as linhas gravadas; se a escrita falhar, a thread
+    para e guarda o erro em `error`, para que o resultado mostre que o
+    arquivo deixou de crescer.
+    """
+
+    def __init__(self, f, rate, stop_event):
+        super().__init__(daemon=True)
+        self.f = f
+        self.rate = rate
+        self.stop_event = stop_event
+        self.lines = 0
+        self.error = None
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                started = time.monotonic()
+                timestamp = datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+                for number in range(self.lines + 1, self.lines + self.rate + 1):
+                    level = random.choice(LEVELS)
+                    if level == 'ERROR':
+                        message = f"upstream timeout after {random.randint(100, 5000)}ms"
+                    elif number % 7 == 0:
+                        message = f"HTTP GET /healthcheck 200 {random.randint(1, 20)}ms"
+                    else:
+                        message = f"user_id={random.randint(1, 10000)} request #{number} processed"
+                    self.f.write(f"[{timestamp}] {level} {message}\n")
+                self.f.flush()
+                self.lines += self.rate
+                self.stop_event.wait(max(0, 1 - (time.monotonic() - started)))
+        except OSError as e:
+            self.error = str(e)
+            print(f"\n✗ Escrita no arquivo de log interrompida: {e}")
+        finally:
+            try:
+                self.f.close()
+            except OSError:
+                pass
+
+
+def format_ms(milliseconds):
+    return '-' if milliseconds is None else f"{milliseconds:.1f}"
+
+
+def print_summary(stats, elapsed, samples, writer=None):
+    """Mostra as latências por cenário, a evolução do RSS e as linhas escritas no log."""
+    print("\n" + "=" * 72)
+    print(f"{'Cenário':<10} {'Reqs':>8} {'Erros':>7} {'Erro %':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print("=" * 72)
+
+    all_latencies = []
+    total_errors = 0
+    for name in SCENARIOS:
+        latencies = sorted(stats.latencies[name])
+        if not latencies:
+            continue
+        all_latencies.extend(latencies)
+        total_errors += stats.errors[name]
+        values = [format_ms(percentile_ms(latencies, p)) for p in PERCENTILES]
+        print(f"{name:<10} {len(latencies):>8} {stats.errors[name]:>7} "
+              f"{100 * stats.errors[name] / len(latencies):>6.1f}% {values[0]:>9} {values[1]:>9} {values[2]:>9}")
+
+    all_latencies.sort()
+    total = len(all_latencies)
+    values = [format_ms(percentile_ms(all_latencies, p)) for p in PERCENTILES]
+    print("-" * 72)
+    print(f"{'total':<10} {total:>8} {total_errors:>7} "
+          f"{100 * total_errors / max(total, 1):>6.1f}% {values[0]:>9} {values[1]:>9} {values[2]:>9}")
+    print(f"\n{total / elapsed:.1f} req/s, {stats.bytes / 1024 / 1024:.1f} MB recebidos em {elapsed:.0f}s")
+
+    for error, count in sorted(stats.error_samples.items(), key=lambda item: -item[1]):
+        print(f"  {count}× {error}")
+
+    rss_values = [sample['rss_kb'] for sample in samples if sample['rss_kb'] is not None]
+    if rss_values:
+        print(f"RSS do servidor: início {rss_values[0] / 1024:.1f} MB, "
+              f"pico {max(rss_values) / 1024:.1f} MB, fim {rss_values[-1] / 1024:.1f} MB")
+
+    if writer:
+        print(f"Linhas escritas no log: {writer.lines} ({writer.lines / elapsed:.1f}/s)")
+        if writer.error:
+            print(f"  ✗ a escrita parou antes do fim: {writer.error}")
+
+    result = {
+        'duration': elapsed,
+        'requests': total,
+        'errors': total_errors,
+        'error_rate': total_errors / max(total, 1),
+        'latency_ms': {f"p{p}": percentile_ms(all_latencies, p) for p in PERCENTILES},
+        'scenarios': {
+            name: {
+                'requests': len(stats.latencies[name]),
+                'errors': stats.errors[name],
+                **{f"p{p}_ms": percentile_ms(sorted(stats.latencies[name]), p) for p in PERCENTILES}
+            }
+            for name in SCENARIOS if stats.latencies[name]
+        },
+        'samples': samples
+    }
+    if writer:
+        result['lines_written'] = writer.lines
+        result['write_error'] = writer.error
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Gerador de carga do PM2 Log Viewer (várias abas com auto-refresh)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos:
+  %(prog)s -f app-out.log                                  # 30 abas, refresh a cada 5s, por 60s
+  %(prog)s -f app-out.log -c 100 -d 300 --pid 1            # Mede também o RSS do processo 1
+  %(prog)s -f load-test.log --log-dir /root/.pm2/logs --write-rate 200
+  %(prog)s -f app-out.log --mix tail=80,search=20 --output resultado.json
+        """
+    )
+    parser.add_argument('--url', default='http://localhost:8001', help='URL do servidor (padrão: %(default)s)')
+    parser.add_argument('-f', '--file', required=True, help='Arquivo de log consultado (nome dentro de LOG_DIR)')
+    parser.add_argument('-u', '--username', default=os.environ.get('ADMIN_USERNAME', 'admin'), help='Usuário para o login')
+    parser.add_argument('-p', '--password', default=os.environ.get('ADMIN_PASSWORD', 'changeme'), help='Senha para o login')
+    parser.add_argument('-c', '--concurrency', type=int, default=30, help='Número de abas simultâneas (padrão: %(default)s)')
+    parser.add_argument('-i', '--interval', type=float, default=5, help='Segundos entre os refreshes de cada aba (padrão: %(default)s)')
+    parser.add_argument('-d', '--duration', type=float, default=60, help='Duração do teste em segundos (padrão: %(default)s)')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, help='Pesos dos cenários (padrão: %(default)s)')
+    parser.add_argument('--limit', type=int, default=50, help='Linhas por página nas consultas a /file/ (padrão: %(default)s)')
+    parser.add_argument('--format', choices=('json', 'compact', 'binary'), default='json', help='Formato das respostas de /file/')
+    parser.add_argument('--range-minutes', type=int, default=60, help='Tamanho do intervalo das consultas de tempo (padrão: %(default)s)')
+    parser.add_argument('--log-dir', help='Diretório dos logs; se informado, o arquivo alvo cresce durante o teste')
+    parser.add_argument('--write-rate', type=int, default=50, help='Linhas por segundo acrescentadas ao arquivo alvo (padrão: %(default)s)')
+    parser.add_argument('--pid', type=int, help='PID do servidor, para medir o RSS via /proc')
+    parser.add_argument('--sample-interval', type=float, default=5, help='Segundos entre as amostras de RSS e latência (padrão: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=30, help='Timeout de cada requisição em segundos (padrão: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='Semente da mistura de consultas, para repetir um teste')
+    parser.add_argument('--output', help='Salva o resultado em JSON, para comparar execuções')
+    args = parser.parse_args()
+    args.url = args.url.rstrip('/')
+
+    print("\n" + "=" * 60)
+    print("PM2 Log Viewer - Teste de Carga")
+    print("=" * 60)
+    print(f"{args.concurrency} abas, refresh a cada {args.interval}s, por {args.duration}s em {args.url}\n")
+
+    stop_event = threading.Event()
+    stats = Stats()
+
+    writer = None
+    if args.log_dir:
+        # Abrir antes de iniciar as abas: um diretório somente leitura (ex: o
+        # volume :ro do compose.yml) encerra o teste em vez de ser ignorado
+        log_path = os.path.join(args.log_dir, args.file)
+        try:
+            log_file = open(log_path, 'a')
+        except OSError as e:
+            print(f"✗ Não foi possível abrir {log_path} para escrita: {e}")
+            sys.exit(1)
+        writer = LogWriter(log_file, args.write_rate, stop_event)
+        writer.start()
+
+    viewers = [Viewer(number, args, stats, stop_event) for number in range(args.concurrency)]
+    for viewer in viewers:
+        viewer.start()
+
+    samples = []
+    started = time.monotonic()
+    try:
+        while not stop_event.wait(min(args.sample_interval, max(0, args.duration - (time.monotonic() - started)))):
+            elapsed = time.monotonic() - started
+            window = stats.take_window()
+            rss = read_rss(args.pid) if args.pid else None
+            samples.append({
+                'time': round(elapsed, 1),
+                'requests': len(window),
+                'p95_ms': percentile_ms(window, 95),
+                'rss_kb': rss,
+                'lines_written': writer.lines if writer else None
+            })
+            rss_text = f", RSS {rss / 1024:.1f} MB" if rss is not None else ''
+            written_text = f", {writer.lines} linhas escritas" if writer else ''
+            print(f"[{elapsed:6.1f}s] {len(window)} reqs, p95 {format_ms(percentile_ms(window, 95))} ms{rss_text}{written_text}")
+            if elapsed >= args.duration:
+                break
+    except KeyboardInterrupt:
+        print("\nInterrompido.")
+    stop_event.set()
+
+    for viewer in viewers:
+        viewer.join(args.timeout)
+    if writer:
+        writer.join()
+    elapsed = time.monotonic() - started
+
+    login_errors = [viewer.login_error for viewer in viewers if viewer.login_error]
+    if login_errors:
+        print(f"\n✗ {len(login_errors)} abas não conseguiram fazer login: {login_errors[0]}")
+
+    result = print_summary(stats, elapsed, samples, writer)
+    result['login_errors'] = len(login_errors)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Resultado salvo em {args.output}")
+
+    if (login_errors and len(login_errors) == len(viewers)) or (writer and writer.error):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Buffers em memória com o final dos arquivos de log mais acessados (PM2 Log Viewer).
+Para cada arquivo quente, mantém um buffer circular com as linhas dos últimos
+N MB já decodificadas, sem códigos ANSI, com timestamp e níveis extraídos.
+Uma thread acompanha o crescimento dos arquivos e acrescenta apenas os bytes
+novos; as consultas que cabem no buffer são respondidas sem ler o disco.
+"""
+import os
+import re
+import sys
+import time
+import threading
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+
+from log_index import ANSI_PATTERN, LEVEL_PATTERN, LEVELS
+from log_reader import file_identity, fingerprint, iter_lines_backward, iter_lines_forward
+from log_time import extract_timestamp_from_line
+
+# Intervalo (segundos) entre as verificações da thread de manutenção
+WATCH_INTERVAL = 1.0
+# Meia-vida (segundos) da contagem de acessos usada para escolher os arquivos quentes
+ACCESS_HALF_LIFE = 60.0
+# Acessos recentes mínimos para um arquivo ser carregado automaticamente
+# (três acessos seguidos, já descontado o decaimento entre eles)
+MIN_ACCESS_SCORE = 2.5
+# Bytes de memória por byte de arquivo, estimados antes do primeiro buffer carregado
+DEFAULT_MEMORY_RATIO = 4.0
+# Memória fixa de cada linha nas listas do buffer (ponteiros, offset e níveis)
+ENTRY_OVERHEAD = 4 * 8 + 8 + 1
+# Compactar as listas quando as linhas descartadas passarem desse número
+COMPACT_THRESHOLD = 4096
+# Menor trecho de arquivo que vale a pena manter em memória
+MIN_BUFFER_BYTES = 64 * 1024
+# Linhas examinadas por vez ao procurar as linhas de um nível nas máscaras
+LEVEL_SCAN_CHUNK = 16384
+
+LEVEL_BITS = {level.encode(): 1 << bit for bit, level in enumerate(LEVELS)}
+
+
+def level_mask(levels):
+    """Máscara de bits de uma sequência de níveis."""
+    mask = 0
+    for level in levels:
+        mask |= LEVEL_BITS[level.encode()]
+    return mask
+
+
+@lru_cache(maxsize=None)
+def level_pattern(mask):
+    """Regex de um byte que aceita as máscaras com algum bit de `mask`, para buscar em C."""
+    values = bytes(value for value in range(256) if value & mask)
+    return re.compile(b'[' + re.escape(values) + b']')
+
+
+class TailSnapshot:
+    """
+    Visão imutável de um TailBuffer em um instante: as listas só recebem
+    linhas no final e são substituídas (nunca alteradas) ao compactar ou
+    descartar o buffer, então a visão pode ser lida sem lock.
+    """
+
+    def __init__(self, buffer):
+        self.identity = buffer.identity
+        self.start = buffer.offsets[buffer.head] if buffer.head < len(buffer.offsets) else buffer.end
+        self.end = buffer.end
+        self.offsets = buffer.offsets
+        self.raw_lines = buffer.raw_lines
+        self.lines = buffer.lines
+        self.timestamps = buffer.timestamps
+        self.masks = buffer.masks
+        self.head = buffer.head
+        self.count = len(buffer.offsets)
+
+    def first_timestamp(self):
+        """Primeiro timestamp do buffer, ou None se nenhuma linha tiver timestamp."""
+        for index in range(self.head, self.count):
+            if self.timestamps[index] is not None:
+                return self.timestamps[index]
+        return None
+
+    def _indexes(self, start, stop, levels, reverse):
+        """
+        Posições das linhas entre `start` e `stop` (posições nas listas). Com
+        `levels`, procura as máscaras dos níveis em blocos, com re sobre uma
+        cópia das máscaras (o array original pode crescer durante a leitura).
+        """
+        if not levels:
+            return range(stop - 1, start - 1, -1) if reverse else range(start, stop)
+        pattern = level_pattern(level_mask(levels))
+        masks = self.masks[start:stop].tobytes()
+
+        def scan():
+            chunks = range(len(masks), 0, -LEVEL_SCAN_CHUNK) if reverse else range(0, len(masks), LEVEL_SCAN_CHUNK)
+            for chunk in chunks:
+                if reverse:
+                    found = [match.start() for match in pattern.finditer(masks, max(0, chunk - LEVEL_SCAN_CHUNK), chunk)]
+                    found.reverse()
+                else:
+                    found = [match.start() for match in pattern.finditer(masks, chunk, chunk + LEVEL_SCAN_CHUNK)]
+                for index in found:
+                    yield start + index
+        return scan()
+
+    def iter_backward(self, bound, levels=()):
+        """
+        Linhas com offset anterior a `bound`, das mais recentes para as mais antigas.
+        Com `levels`, apenas as linhas que contêm algum desses níveis.
+        Retorna (offset, linha em bytes, linha limpa, timestamp).
+        """
+        stop = bisect_left(self.offsets, bound, self.head, self.count)
+        for index in self._indexes(self.head, stop, levels, True):
+            yield self.offsets[index], self.raw_lines[index], self.lines[index], self.timestamps[index]
+
+    def iter_forward(self, offset, bound, levels=()):
+        """Linhas com offset entre `offset` e `bound`, das mais antigas para as mais recentes."""
+        start = bisect_left(self.offsets, offset, self.head, self.count)
+        stop = bisect_left(self.offsets, bound, start, self.count)
+        for index in self._indexes(start, stop, levels, False):
+            yield self.offsets[index], self.raw_lines[index], self.lines[index], self.timestamps[index]
+
+
+class TailBuffer:
+    """
+    Buffer circular com as linhas completas dos últimos `max_bytes` de um arquivo.
+    Truncamentos e rotações são detectados pelo inode e por um checksum dos
+    últimos bytes lidos, como no índice de níveis.
+    """
+
+    def __init__(self, path, max_bytes, clean_line):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.clean_line = clean_line
+        self._lock = threading.Lock()
+        self._stat = None
+        self.identity = None
+        self._reset(0)
+
+    def _reset(self, end):
+        """Descarta as linhas em memória; a próxima leitura começa em `end`."""
+        self.offsets = array('Q')
+        self.raw_lines = []
+        self.lines = []
+        self.timestamps = []
+        self.masks = array('B')
+        self.head = 0
+        self.end = end
+        self.memory = 0
+        self.fingerprint = None
+
+    def refresh(self):
+        """
+        Acrescenta as linhas completas escritas desde a última leitura. Sem
+        mudança de tamanho, data ou inode, não abre o arquivo.
+        Retorna False se o arquivo não existir mais.
+        """
+        with self._lock:
+            try:
+                stat_result = os.stat(self.path)
+            except OSError:
+                self._reset(0)
+                self.identity = self._stat = None
+                return False
+            current = (stat_result.st_size, stat_result.st_mtime_ns)
+            identity = file_identity(stat_result)
+            if identity == self.identity and current == self._stat:
+                return True
+
+            with open(self.path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                # Arquivo novo, truncado (pm2 flush, pm2-logrotate) ou reescrito
+                if (identity != self.identity or size < self.end
+                        or fingerprint(f, self.end) != self.fingerprint):
+                    self.identity = identity
+                    self._reset(self._tail_start(f, size))
+                if size > self.end:
+                    f.seek(self.end)
+                    self._append(f.read(size - self.end))
+                self.fingerprint = fingerprint(f, self.end)
+            self._stat = current
+            return True
+
+    def _tail_start(self, f, size):
+        """Início da primeira linha completa dentro dos últimos `max_bytes` do arquivo."""
+        start = max(0, size - self.max_bytes)
+        if start == 0:
+            return 0
+        f.seek(start - 1)
+        f.readline()
+        return f.tell()
+
+    def _append(self, data):
+        """Decodifica e guarda as linhas completas de `data`, que começa em self.end."""
+        offset = self.end
+        clean_line = self.clean_line
+        # O último pedaço é a linha incompleta (ou vazio), lida na próxima atualização
+        for part in data.split(b'\n')[:-1]:
+            raw_line = part + b'\n'
+            text = raw_line.decode('utf-8', errors='ignore')
+            timestamp = extract_timestamp_from_line(text)
+            line = clean_line(text)
+            memory = sys.getsizeof(raw_line) + sys.getsizeof(line) + ENTRY_OVERHEAD
+            # Linhas do mesmo segundo compartilham o mesmo objeto datetime
+            if timestamp is not None:
+                if self.timestamps and self.timestamps[-1] == timestamp:
+                    timestamp = self.timestamps[-1]
+                else:
+                    memory += sys.getsizeof(timestamp)
+            # Mesmos tokens e limpeza ANSI do índice de níveis
+            levels = LEVEL_PATTERN.findall(ANSI_PATTERN.sub(b'', raw_line) if b'\x1b' in raw_line else raw_line)
+            mask = 0
+            for token in levels:
+                mask |= LEVEL_BITS[token]
+
+            self.offsets.append(offset)
+            self.raw_lines.append(raw_line)
+            self.lines.append(line)
+            self.timestamps.append(timestamp)
+            self.masks.append(mask)
+            self.memory += memory
+            offset += len(raw_line)
+        self.end = offset
+        self._trim()
+
+    def _trim(self, max_memory=None):
+        """
+        Descarta as linhas mais antigas que ficaram fora dos últimos `max_bytes`
+        ou, com `max_memory`, até a memória estimada caber nesse limite.
+        """
+        head = self.head
+        while head < len(self.offsets) and (self.end - self.offsets[head] > self.max_bytes
+                                            or (max_memory is not None and self.memory > max_memory)):
+            self.memory -= self._entry_memory(head)
+            head += 1
+        self.head = head
+        if head > COMPACT_THRESHOLD and head * 2 > len(self.offsets):
+            # Novas listas em vez de alterar as atuais, que podem estar em uso por um TailSnapshot
+            self.offsets = self.offsets[head:]
+            self.raw_lines = self.raw_lines[head:]
+            self.lines = self.lines[head:]
+            self.timestamps = self.timestamps[head:]
+            self.masks = self.masks[head:]
+            self.head = 0
+
+    def _entry_memory(self, index):
+        memory = sys.getsizeof(self.raw_lines[index]) + sys.getsizeof(self.lines[index]) + ENTRY_OVERHEAD
+        timestamp = self.timestamps[index]
+        if timestamp is not None and (index == 0 or self.timestamps[index - 1] is not timestamp):
+            memory += sys.getsizeof(timestamp)
+        return memory
+
+    def shrink(self, max_memory):
+        """Reduz o buffer às linhas mais recentes que cabem em `max_memory`."""
+        with self._lock:
+            self._trim(max_memory)
+            self.max_bytes = self.file_bytes()
+
+    def file_bytes(self):
+        """Bytes do arquivo cobertos pelo buffer."""
+        return self.end - self.offsets[self.head] if self.head < len(self.offsets) else 0
+
+    def snapshot(self):
+        with self._lock:
+            return TailSnapshot(self)
+
+
+class TailCache:
+    """
+    Conjunto de buffers dos arquivos quentes: os fixados em `pinned` e os
+    `hot_files` mais acessados recentemente. A soma da memória estimada dos
+    buffers fica abaixo de `max_memory`; ao ultrapassá-la, os buffers de menor
+    prioridade (menos acessados, e os fixados por último) são descartados.
+    """
+
+    def __init__(self, max_memory, file_bytes, hot_files=4, pinned=(), clean_line=lambda line: line):
+        self.max_memory = max_memory
+        self.file_bytes = file_bytes
+        self.hot_files = hot_files
+        self.pinned = list(pinned)
+        self.clean_line = clean_line
+        self.buffers = {}
+        self.scores = {}
+        self._lock = threading.Lock()
+
+    def record_access(self, path, now=None):
+        """Conta um acesso ao arquivo, com decaimento exponencial dos acessos antigos."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            score, last = self.scores.get(path, (0.0, now))
+            self.scores[path] = (score * 0.5 ** ((now - last) / ACCESS_HALF_LIFE) + 1, now)
+
+    def _score(self, path, now):
+        score, last = self.scores.get(path, (0.0, now))
+        return score * 0.5 ** ((now - last) / ACCESS_HALF_LIFE)
+
+    def lookup(self, stream):
+        """
+        Registra o acesso ao arquivo atual do stream e retorna um TailSnapshot
+        atualizado do seu buffer, ou None se o arquivo não estiver em memória.
+        """
+        self.record_access(stream.path)
+        buffer = self.buffers.get(stream.path)
+        if buffer is None or not stream.segments or not buffer.refresh():
+            return None
+        segment = stream.segments[-1]
+        snapshot = buffer.snapshot()
+        if segment.path != stream.path or snapshot.identity != segment.identity or snapshot.start > segment.size:
+            return None
+        return snapshot
+
+    def wanted(self, now=None):
+        """Arquivos que devem ficar em memória, em ordem de prioridade."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for path in [path for path in self.scores if self._score(path, now) < 0.1]:
+                del self.scores[path]
+            ranked = sorted((path for path in self.scores
+                             if path not in self.pinned and self._score(path, now) >= MIN_ACCESS_SCORE),
+                            key=lambda path: -self._score(path, now))
+        return self.pinned + ranked[:self.hot_files]
+
+    def memory(self):
+        return sum(buffer.memory for buffer in list(self.buffers.values()))
+
+    def _memory_ratio(self):
+        """Memória por byte de arquivo medida nos buffers atuais."""
+        buffers = list(self.buffers.values())
+        covered = sum(buffer.file_bytes() for buffer in buffers)
+        if covered < MIN_BUFFER_BYTES:
+            return DEFAULT_MEMORY_RATIO
+        return sum(buffer.memory for buffer in buffers) / covered
+
+    def maintain(self):
+        """
+        Atualiza os buffers com as linhas novas, carrega os arquivos que ficaram
+        quentes e descarta os que esfriaram. Em ordem de prioridade, cada buffer
+        recebe a memória que sobrou dos anteriores: os que não cabem são
+        reduzidos às linhas mais recentes, ou descartados.
+        """
+        wanted = [path for path in self.wanted() if os.path.isfile(path)]
+        for path in list(self.buffers):
+            if path not in wanted:
+                del self.buffers[path]
+
+        ratio = self._memory_ratio()
+        used = 0
+        for path in wanted:
+            available = self.max_memory - used
+            max_bytes = min(self.file_bytes, int(available / ratio))
+            buffer = self.buffers.get(path)
+            if buffer is not None and (not buffer.refresh() or max_bytes >= 2 * buffer.max_bytes):
+                # Arquivo removido, ou buffer reduzido antes que agora pode crescer
+                del self.buffers[path]
+                buffer = None
+            if buffer is None:
+                if max_bytes < MIN_BUFFER_BYTES:
+                    continue
+                buffer = TailBuffer(path, max_bytes, self.clean_line)
+                if not buffer.refresh():
+                    continue
+                self.buffers[path] = buffer
+
+            if buffer.memory > available:
+                buffer.shrink(available)
+                if buffer.file_bytes() < MIN_BUFFER_BYTES:
+                    del self.buffers[path]
+                    continue
+            used += buffer.memory
+
+    def stats(self):
+        """Resumo dos buffers em memória."""
+        return {
+            'enabled': True,
+            'max_memory': self.max_memory,
+            'memory': self.memory(),
+            'files': {os.path.basename(path): {'memory': buffer.memory, 'bytes': buffer.file_bytes(),
+                                               'lines': len(buffer.offsets) - buffer.head}
+                      for path, buffer in list(self.buffers.items())}
+        }
+
+    def start(self):
+        """Inicia a thread que mantém os buffers atualizados."""
+        def watch():
+            while True:
+                try:
+                    self.maintain()
+                except Exception as e:
+                    print(f"Erro ao atualizar o cache de logs: {e}")
+                time.sleep(WATCH_INTERVAL)
+        threading.Thread(target=watch, name='tail-cache', daemon=True).start()
+
+    def iter_lines(self, stream, tail, levels=(), reverse=True, position=None, since=None):
+        """
+        Como LogStream.iter_lines_backward/iter_lines_forward (ou iter_level_lines,
+        com `levels`), mas lendo do buffer `tail` o trecho do arquivo atual que ele
+        cobre. Retorna (segmento, offset, linha em bytes, linha limpa, timestamp);
+        as linhas lidas do disco vêm com linha limpa e timestamp None.
+        Com `since`, como LogStream, o arquivo atual é sempre lido inteiro e os
+        rotacionados são ignorados se a primeira linha do atual for anterior a `since`.
+        """
+        last = len(stream.segments) - 1
+        segment = stream.segments[last]
+        if reverse:
+            index, offset = position if position else (last, None)
+            bound = segment.size if offset is None else offset
+            if index != last or bound <= tail.start:
+                yield from self._iter_disk(stream, levels, reverse, position, since)
+                return
+
+            # Linha ainda incompleta no final do arquivo (o índice de níveis também a ignora)
+            if bound > tail.end and not levels:
+                with open(segment.path, 'rb') as f:
+                    for line_offset, raw_line in iter_lines_backward(f, bound, tail.end):
+                        yield segment, line_offset, raw_line, None, None
+
+            for line_offset, raw_line, line, timestamp in tail.iter_backward(bound, levels):
+                yield segment, line_offset, raw_line, line, timestamp
+
+            if tail.start > 0:
+                # O restante do arquivo atual é sempre lido, como em LogStream
+                yield from self._iter_disk(stream, levels, reverse, (last, tail.start), since)
+                return
+            if since:
+                # Buffer com o arquivo inteiro: mesma verificação de LogStream._starts_before
+                first = tail.first_timestamp()
+                if first is not None and first < since:
+                    return
+            if last > 0:
+                yield from self._iter_disk(stream, levels, reverse, (last - 1, None), since)
+        else:
+            index, offset = position if position else (0, 0)
+            if index != last or offset < tail.start:
+                yield from self._iter_disk(stream, levels, reverse, position, since)
+                return
+            for line_offset, raw_line, line, timestamp in tail.iter_forward(offset, segment.size, levels):
+                yield segment, line_offset, raw_line, line, timestamp
+            if segment.size > max(offset, tail.end) and not levels:
+                with open(segment.path, 'rb') as f:
+                    for line_offset, raw_line in iter_lines_forward(f, max(offset, tail.end)):
+                        if line_offset >= segment.size:
+                            break
+                        yield segment, line_offset, raw_line, None, None
+
+    @staticmethod
+    def _iter_disk(stream, levels, reverse, position, since):
+        if levels:
+            lines = stream.iter_level_lines(levels, reverse, position, since, extract_timestamp_from_line)
+        elif reverse:
+            lines = stream.iter_lines_backward(position, since, extract_timestamp_from_line)
+        else:
+            lines = stream.iter_lines_forward(position)
+        for segment, line_offset, raw_line in lines:
+            yield segment, line_offset, raw_line, None, None
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Agrupamento de linhas de log em templates para o PM2 Log Viewer.
+Linhas quase idênticas (ex: "HTTP GET /ping 200 1ms") são reduzidas a um
+template com os tokens variáveis mascarados (números, IDs, durações, ...),
+em uma única passada e com memória limitada pelo número de templates.
+"""
+import re
+import zlib
+
+# Número máximo de templates mantidos por consulta; linhas de templates novos
+# além desse limite são apenas contadas
+MAX_TEMPLATES = 500
+
+# Tokens variáveis, na ordem em que são mascarados
+MASKS = (
+    (re.compile(r'\d{2}-\d{2}-\d{4} \d{2}:\d{2}:\d{2}'
+                r'|\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?Z?'
+                r'|\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}:\d{2} (?:AM|PM)'
+                r'|\w{3}, \d{2} \w{3} \d{4} \d{2}:\d{2}:\d{2} GMT'), '<ts>'),
+    (re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'), '<uuid>'),
+    (re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b'), '<ip>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b|\b(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{8,}\b'), '<hex>'),
+    (re.compile(r'\b\d+(?:\.\d+)?(?:ms|us|µs|ns|s|m|h)\b'), '<dur>'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '<num>'),
+)
+
+
+def mask_line(line):
+    """Substitui os tokens variáveis da linha, retornando o seu template."""
+    for pattern, replacement in MASKS:
+        line = pattern.sub(replacement, line)
+    return line
+
+
+def template_id(template):
+    """Identificador curto e estável de um template, usado para expandi-lo."""
+    return format(zlib.crc32(template.encode()), '08x')
+
+
+class TemplateClusterer:
+    """
+    Agrupa linhas já limpas (sem ANSI) por template, recebendo-as da mais
+    recente para a mais antiga.
+    """
+
+    def __init__(self, max_templates=MAX_TEMPLATES):
+        self.max_templates = max_templates
+        self.templates = {}
+        self.lines = 0
+        self.overflow = 0
+
+    def add(self, line):
+        """Conta a linha no seu template."""
+        self.lines += 1
+        template = mask_line(line)
+        entry = self.templates.get(template)
+        if entry is None:
+            if len(self.templates) >= self.max_templates:
+                self.overflow += 1
+                return
+            # A primeira linha vista é a mais recente do template
+            entry = {'count': 0, 'newest': line, 'oldest': line}
+            self.templates[template] = entry
+        entry['count'] += 1
+        entry['oldest'] = line
+
+    def results(self, extract_timestamp):
+        """
+        Retorna os templates ordenados pela quantidade de linhas, com o primeiro
+        e o último timestamp e uma linha de exemplo (a mais recente).
+        """
+        results = []
+        for template, entry in self.templates.items():
+            first = extract_timestamp(entry['oldest'])
+            last = extract_timestamp(entry['newest'])
+            results.append({
+                'id': template_id(template),
+                'template': template,
+                'count': entry['count'],
+                'first': first.isoformat() if first else None,
+                'last': last.isoformat() if last else None,
+                'sample': entry['newest']
+            })
+        results.sort(key=lambda result: result['count'], reverse=True)
+        return results
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Índice incremental de níveis de log para o PM2 Log Viewer.
+Mantém, para cada arquivo, os offsets (em bytes) das linhas de cada nível,
+permitindo filtrar por nível sem varrer o arquivo inteiro a cada consulta.
+"""
+import os
+import re
+import sys
+import heapq
+from bisect import bisect_left
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from log_reader import file_identity, fingerprint
+
+# Mesmos tokens coloridos por displayPage() no index.html
+LEVELS = ('INFO', 'ERROR', 'WARN', 'WARNING', 'DEBUG', 'FATAL', 'HTTP')
+
+LEVEL_PATTERN = re.compile(rb'\b(' + b'|'.join(level.encode() for level in LEVELS) + rb')\b')
+ANSI_PATTERN = re.compile(rb'\x1b\[[0-9;]*m')
+
+# Limite de memória (MB) somando os índices de todos os arquivos; os usados há
+# mais tempo são descartados e reconstruídos na próxima consulta
+LEVEL_INDEX_MB = float(os.environ.get('LEVEL_INDEX_MB', '64'))
+MAX_INDEX_MEMORY = int(LEVEL_INDEX_MB * 1024 * 1024)
+
+
+class LevelIndex:
+    """Offsets das linhas de cada nível de um arquivo, atualizados incrementalmente."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """Descarta o índice atual (arquivo truncado ou reescrito)."""
+        self.offsets = {level: array('Q') for level in LEVELS}
+        self.scanned = 0
+        self.fingerprint = zlib.crc32(b'')
+
+    def update(self):
+        """
+        Indexa apenas os bytes adicionados desde a última atualização.
+        Linhas incompletas (sem quebra de linha) ficam para a próxima chamada.
+        """
+        with self._lock, open(self.path, 'rb') as f:
+            # Truncado (pm2 flush, pm2-logrotate) ou reescrito desde a última leitura
+            size = os.fstat(f.fileno()).st_size
+            if size < self.scanned or fingerprint(f, self.scanned) != self.fingerprint:
+                self._reset()
+            if size == self.scanned:
+                return
+
+            offset = self.scanned
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                # Remover códigos ANSI antes de procurar os tokens, como o frontend
+                text = ANSI_PATTERN.sub(b'', line) if b'\x1b' in line else line
+                for token in set(LEVEL_PATTERN.findall(text)):
+                    self.offsets[token.decode()].append(offset)
+                offset += len(line)
+            self.scanned = offset
+            self.fingerprint = fingerprint(f, offset)
+
+    def iter_offsets(self, levels, reverse=True, bound=None):
+        """
+        Percorre os offsets das linhas que contêm algum dos níveis informados,
+        sem repetir linhas com mais de um nível. Por padrão, mais recentes primeiro.
+        Com `bound`, apenas offsets anteriores a ele (reverse) ou a partir dele.
+        """
+        arrays = []
+        for level in levels:
+            offsets = self.offsets[level]
+            if bound is None:
+                arrays.append(reversed(offsets) if reverse else offsets)
+                continue
+            position = bisect_left(offsets, bound)
+            # map() liga o array atual; um gerador leria a variável do último nível do laço
+            if reverse:
+                arrays.append(map(offsets.__getitem__, range(position - 1, -1, -1)))
+            else:
+                arrays.append(map(offsets.__getitem__, range(position, len(offsets))))
+
+        last = None
+        for offset in heapq.merge(*arrays, reverse=reverse):
+            if offset != last:
+                yield offset
+                last = offset
+
+    def memory(self):
+        """Memória ocupada pelos arrays de offsets."""
+        return sum(sys.getsizeof(offsets) for offsets in list(self.offsets.values()))
+
+    def iter_lines(self, levels, reverse=True, bound=None):
+        """Lê diretamente as linhas indexadas, retornando (offset, linha em bytes)."""
+        with open(self.path, 'rb') as f:
+            for offset in self.iter_offsets(levels, reverse, bound):
+                f.seek(offset)
+                yield offset, f.readline()
+
+
+# Índices por identidade do arquivo (dispositivo, inode), do usado há mais tempo
+# para o mais recente. Um arquivo renomeado pela rotação continua usando o mesmo índice.
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def parse_levels(values):
+    """
+    Converte os valores do parâmetro level= (ex: ['ERROR,FATAL']) em uma tupla de níveis.
+    Levanta ValueError para níveis desconhecidos.
+    """
+    levels = []
+    for value in values:
+        for level in value.split(','):
+            level = level.strip().upper()
+            if not level:
+                continue
+            if level not in LEVELS:
+                raise ValueError(f"Nível desconhecido: {level}")
+            if level not in levels:
+                levels.append(level)
+    return tuple(levels)
+
+
+def get_level_index(path):
+    """Retorna o índice do arquivo, já atualizado com as linhas novas."""
+    identity = file_identity(os.stat(path))
+    with _indexes_lock:
+        index = _indexes.get(identity)
+        if index is None:
+            _prune_indexes()
+            index = LevelIndex(path)
+            _indexes[identity] = index
+        else:
+            # O arquivo pode ter sido renomeado pela rotação
+            index.path = path
+            _indexes.move_to_end(identity)
+    index.update()
+    with _indexes_lock:
+        _evict_indexes(identity)
+    return index
+
+
+def _prune_indexes():
+    """Remove índices de arquivos que não existem mais (ex: rotações antigas apagadas)."""
+    for identity, index in list(_indexes.items()):
+        try:
+            current = file_identity(os.stat(index.path))
+        except OSError:
+            current = None
+        if current != identity:
+            del _indexes[identity]
+
+
+def _evict_indexes(keep):
+    """
+    Descarta os índices usados há mais tempo (exceto o de `keep`) enquanto a
+    memória somada passar de MAX_INDEX_MEMORY. Leituras em andamento continuam
+    com os arrays do índice descartado.
+    """
+    memory = sum(index.memory() for index in _indexes.values())
+    for identity in list(_indexes):
+        if memory <= MAX_INDEX_MEMORY:
+            break
+        if identity != keep:
+            memory -= _indexes.pop(identity).memory()
@@ -0,0 +1,682 @@
+#!/usr/bin/env python3
+"""
+Linguagem de consulta do PM2 Log Viewer (parâmetro q= de /file/).
+A consulta é compilada uma vez por requisição em um plano: os predicados mais
+baratos e seletivos são avaliados primeiro (literais sobre os bytes da linha
+antes de decodificá-la, limites de data/hora antes de regex), e filtros de
+nível seletivos usam o índice de níveis em vez de ler todas as linhas.
+
+Sintaxe:
+    timeout AND NOT healthcheck     termos sem diferenciar maiúsculas/minúsculas
+    "connection reset"              frase com espaços
+    /user_id=\\d+/   /erro/i          expressão regular (com flag i opcional)
+    level:ERROR OR level:FATAL      nível, como no parâmetro level=
+    (a OR b) c                      parênteses; termos lado a lado são AND
+"""
+import re
+
+from log_index import ANSI_PATTERN, parse_levels
+from log_time import extract_timestamp_from_line
+
+# Custo estimado de cada predicado por linha, em unidades de uma busca de
+# literal sem diferenciar maiúsculas/minúsculas (decodificar, converter para
+# minúsculas e procurar), medidos com bench_query.py
+COST_LITERAL = 1
+COST_BYTES_LITERAL = 0.5
+COST_LEVEL = 4
+COST_TIME = 15
+# Regex que começa com um literal é rápida: o módulo re procura o prefixo
+# antes de tentar casar o restante
+COST_REGEX_WITH_PREFIX = 1.5
+COST_REGEX = 12
+
+# Fração estimada das linhas que passam em cada predicado
+SELECTIVITY_LITERAL = 0.1
+SELECTIVITY_REGEX = 0.1
+SELECTIVITY_TIME_BOUND = 0.5
+LEVEL_SELECTIVITY = {
+    'INFO': 0.6, 'HTTP': 0.2, 'DEBUG': 0.1, 'WARN': 0.05,
+    'WARNING': 0.05, 'ERROR': 0.03, 'FATAL': 0.005
+}
+# Filtros de nível que passam em mais linhas do que isso são mais baratos
+# como predicado do que lendo linha a linha pelo índice (um seek por linha)
+INDEX_MAX_SELECTIVITY = 0.2
+# Tamanho mínimo do literal extraído de uma regex para usá-lo como pré-filtro
+MIN_PREFILTER_LENGTH = 2
+# Escapes seguidos de um número fixo de dígitos hexadecimais
+HEX_ESCAPE_LENGTHS = {'x': 2, 'u': 4, 'U': 8}
+# Octal (\0, \0oo ou \ooo) ou referência a grupo (\1 a \99), sem a barra
+NUMERIC_ESCAPE_PATTERN = re.compile(r'0[0-7]{0,2}|[0-7]{3}|[0-9]{1,2}')
+
+TOKEN_PATTERN = re.compile(r'''
+    \s*(?:
+        (?P<paren>[()])
+      | "(?P<phrase>(?:[^"\\]|\\.)*)"
+      | /(?P<regex>(?:[^/\\]|\\.)+)/(?P<flags>i?)(?=[\s()]|$)
+      | (?P<field>level):(?P<value>"(?:[^"\\]|\\.)*"|[^\s()]+)
+      | (?P<word>[^\s()]+)
+    )''', re.VERBOSE)
+KEYWORDS = ('AND', 'OR', 'NOT')
+REGEX_FLAGS = {'i': re.IGNORECASE}
+
+_MISSING = object()
+
+
+class _Line:
+    """
+    Linha sendo avaliada por um plano. As representações derivadas dos bytes
+    (texto decodificado, texto em minúsculas, timestamp) são calculadas sob
+    demanda e compartilhadas entre os predicados. O timestamp pode vir já
+    extraído (ex: buffers em memória de log_cache.py).
+    """
+    __slots__ = ('raw', '_text', '_lower', '_timestamp')
+
+    def __init__(self, raw, timestamp=_MISSING):
+        self.raw = raw
+        self._text = None
+        self._lower = None
+        self._timestamp = timestamp
+
+    @property
+    def text(self):
+        text = self._text
+        if text is None:
+            text = self._text = self.raw.decode('utf-8', 'ignore')
+        return text
+
+    @property
+    def lower(self):
+        lower = self._lower
+        if lower is None:
+            lower = self._lower = self.text.lower()
+        return lower
+
+    @property
+    def timestamp(self):
+        timestamp = self._timestamp
+        if timestamp is _MISSING:
+            timestamp = self._timestamp = extract_timestamp_from_line(self.text)
+        return timestamp
+
+
+class Predicate:
+    """Nó do plano: custo e seletividade estimados e a função que o avalia."""
+    cost = COST_LITERAL
+    selectivity = 1.0
+
+    def compile(self):
+        """Função `matches(line)` que avalia o predicado sobre uma _Line."""
+        raise NotImplementedError
+
+    def describe(self):
+        raise NotImplementedError
+
+
+class Literal(Predicate):
+    """
+    Substring, por padrão sem diferenciar maiúsculas/minúsculas (como o
+    parâmetro search=). Termos exatos (pré-filtros de regex) são procurados
+    nos bytes da linha, sem decodificá-la.
+    Como `prefilter` de uma regex, o literal só descarta linhas ASCII: em
+    linhas com outros caracteres, a regex pode casar com equivalências de
+    maiúsculas (ex: 'ſ' com /s/i) ou bytes inválidos ignorados na decodificação.
+    """
+    selectivity = SELECTIVITY_LITERAL
+
+    def __init__(self, term, ignore_case=True, prefilter=False):
+        self.term = term
+        self.ignore_case = ignore_case
+        self.prefilter = prefilter
+        self.cost = COST_BYTES_LITERAL if not ignore_case and term.isascii() else COST_LITERAL
+
+    def compile(self):
+        if self.ignore_case:
+            term = self.term.lower()
+            condition = lambda line: term in line.lower
+        elif self.term.isascii():
+            term = self.term.encode()
+            condition = lambda line: term in line.raw
+        else:
+            term = self.term
+            condition = lambda line: term in line.text
+        if self.prefilter:
+            return lambda line: condition(line) or not line.raw.isascii()
+        return condition
+
+    def describe(self):
+        return f"literal({self.term!r}{'' if self.ignore_case else ', exato'})"
+
+
+class Regex(Predicate):
+    """Expressão regular aplicada à linha decodificada."""
+    selectivity = SELECTIVITY_REGEX
+
+    def __init__(self, pattern, flags=''):
+        self.pattern = pattern
+        self.flags = flags
+        re_flags = 0
+        for flag in flags:
+            if flag not in REGEX_FLAGS:
+                raise ValueError(f"Flag de regex desconhecida: {flag}")
+            re_flags |= REGEX_FLAGS[flag]
+        try:
+            self.regex = re.compile(pattern, re_flags)
+        except re.error as e:
+            raise ValueError(f"Regex inválida /{pattern}/: {e}")
+
+        runs = literal_runs(pattern)
+        self.required = max(runs, key=len)
+        # Prefixo literal usado pelo próprio módulo re (apenas sem IGNORECASE)
+        self.prefix = runs[0] if not re_flags else ''
+        self.cost = COST_REGEX_WITH_PREFIX if len(self.prefix) >= MIN_PREFILTER_LENGTH else COST_REGEX
+
+    def compile(self):
+        search = self.regex.search
+        return lambda line: search(line.text) is not None
+
+    def describe(self):
+        return f"regex(/{self.pattern}/{self.flags})"
+
+
+class Level(Predicate):
+    """
+    A linha contém algum dos níveis como palavra inteira, após remover os
+    códigos ANSI (mesma regra do índice de níveis). A busca dos tokens como
+    substring descarta a maioria das linhas antes da regex.
+    """
+    cost = COST_LEVEL
+
+    def __init__(self, levels):
+        self.levels = tuple(levels)
+        self.selectivity = min(1.0, sum(LEVEL_SELECTIVITY[level] for level in self.levels))
+
+    def compile(self):
+        tokens = [level.encode() for level in self.levels]
+        pattern = re.compile(rb'\b(?:' + b'|'.join(tokens) + rb')\b')
+
+        def matches(line):
+            raw = line.raw
+            for token in tokens:
+                if token in raw:
+                    break
+            else:
+                return False
+            if b'\x1b' in raw:
+                raw = ANSI_PATTERN.sub(b'', raw)
+            return pattern.search(raw) is not None
+        return matches
+
+    def describe(self):
+        return f"level({','.join(self.levels)})"
+
+
+class TimeRange(Predicate):
+    """Timestamp da linha dentro do intervalo; linhas sem timestamp não passam."""
+    cost = COST_TIME
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        bounds = (start is not None) + (end is not None)
+        self.selectivity = SELECTIVITY_TIME_BOUND ** bounds
+
+    def compile(self):
+        start, end = self.start, self.end
+
+        def matches(line):
+            timestamp = line.timestamp
+            return (timestamp is not None and (start is None or timestamp >= start)
+                    and (end is None or timestamp <= end))
+        return matches
+
+    def describe(self):
+        start = self.start.isoformat() if self.start else ''
+        end = self.end.isoformat() if self.end else ''
+        return f"time({start}..{end})"
+
+
+class TextPredicate(Predicate):
+    """Predicado arbitrário sobre a linha decodificada (ex: template do modo collapse)."""
+
+    def __init__(self, name, func, cost, selectivity):
+        self.name = name
+        self.func = func
+        self.cost = cost
+        self.selectivity = selectivity
+
+    def compile(self):
+        func = self.func
+        return lambda line: func(line.text)
+
+    def describe(self):
+        return self.name
+
+
+class Not(Predicate):
+    def __init__(self, child):
+        self.child = child
+        self.cost = child.cost
+        self.selectivity = 1 - child.selectivity
+
+    def compile(self):
+        child = self.child.compile()
+        return lambda line: not child(line)
+
+    def describe(self):
+        return f"NOT {self.child.describe()}"
+
+
+class And(Predicate):
+    """Conjunção avaliada na ordem dos filhos, parando no primeiro que falha."""
+
+    def __init__(self, children):
+        self.children = list(children)
+        self._estimate()
+
+    def _estimate(self):
+        # Custo esperado: cada filho só é avaliado se os anteriores passaram
+        self.cost = 0
+        self.selectivity = 1.0
+        for child in self.children:
+            self.cost += self.selectivity * child.cost
+            self.selectivity *= child.selectivity
+
+    def order(self):
+        """Ordena pelo custo por linha descartada (ordem ótima para avaliação em curto-circuito)."""
+        self.children.sort(key=lambda child: child.cost / max(1 - child.selectivity, 1e-9))
+        self._estimate()
+
+    def compile(self):
+        children = [child.compile() for child in self.children]
+
+        def matches(line):
+            for child in children:
+                if not child(line):
+                    return False
+            return True
+        return matches
+
+    def describe(self):
+        return '(' + ' AND '.join(child.describe() for child in self.children) + ')'
+
+
+class Or(Predicate):
+    """Disjunção avaliada na ordem dos filhos, parando no primeiro que passa."""
+
+    def __init__(self, children):
+        self.children = list(children)
+        self._estimate()
+
+    def _estimate(self):
+        self.cost = 0
+        rejected = 1.0
+        for child in self.children:
+            self.cost += rejected * child.cost
+            rejected *= 1 - child.selectivity
+        self.selectivity = 1 - rejected
+
+    def order(self):
+        """Ordena pelo custo por linha aceita."""
+        self.children.sort(key=lambda child: child.cost / max(child.selectivity, 1e-9))
+        self._estimate()
+
+    def compile(self):
+        children = [child.compile() for child in self.children]
+
+        def matches(line):
+            for child in children:
+                if child(line):
+                    return True
+            return False
+        return matches
+
+    def describe(self):
+        return '(' + ' OR '.join(child.describe() for child in self.children) + ')'
+
+
+def tokenize(text, prefilter=True):
+    """
+    Divide a consulta em tokens (tipo, valor). Com prefilter=False, as regex
+    ficam sem o pré-filtro de literal.
+    """
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Consulta inválida perto de: {text[position:]}")
+        position = match.end()
+        if match['paren']:
+            tokens.append((match['paren'], None))
+        elif match['phrase'] is not None:
+            tokens.append(('term', Literal(_unescape(match['phrase']))))
+        elif match['regex'] is not None:
+            regex = Regex(match['regex'], match['flags'])
+            tokens.append(('term', _with_prefilter(regex) if prefilter else regex))
+        elif match['field'] is not None:
+            tokens.append(('term', _field_term(match['field'], match['value'])))
+        elif match['word'] in KEYWORDS:
+            tokens.append((match['word'], None))
+        else:
+            tokens.append(('term', Literal(match['word'])))
+    return tokens
+
+
+def _unescape(value):
+    return re.sub(r'\\(.)', r'\1', value)
+
+
+def _field_term(field, value):
+    if value.startswith('"'):
+        value = _unescape(value[1:-1])
+    levels = parse_levels([value])
+    if not levels:
+        raise ValueError(f"Nenhum nível informado em {field}:")
+    return Level(levels)
+
+
+def _with_prefilter(regex):
+    """
+    Precede a regex, quando possível, pelo maior literal que toda ocorrência
+    dela precisa conter. O literal é testado nos bytes da linha e evita
+    decodificar e rodar a regex na maioria das linhas. Regex que já começam
+    com um literal não precisam: o módulo re faz o mesmo.
+    """
+    if len(regex.required) < MIN_PREFILTER_LENGTH or len(regex.prefix) >= MIN_PREFILTER_LENGTH:
+        return regex
+    return And([Literal(regex.required, ignore_case='i' in regex.flags, prefilter=True), regex])
+
+
+def _skip_quantifier(pattern, i):
+    """Posição após o quantificador (*, +, ?, {m,n}) que começa em `i`, se houver."""
+    if pattern[i:i + 1] in ('*', '+', '?'):
+        return i + 1
+    if pattern[i:i + 1] == '{':
+        end = pattern.find('}', i)
+        return end + 1 if end != -1 else len(pattern)
+    return i
+
+
+def _skip_escape(pattern, i):
+    """
+    Posição após a sequência de escape que começa em `i` (a barra invertida) e
+    o caractere literal que ela representa, ou None se não for um literal simples
+    (\\d, \\b, \\x41, octais, referências a grupos, ...).
+    """
+    escaped = pattern[i + 1:i + 2]
+    if not escaped:
+        return len(pattern), None
+    if not (escaped.isascii() and escaped.isalnum()):
+        return i + 2, escaped
+    if escaped in HEX_ESCAPE_LENGTHS:
+        return i + 2 + HEX_ESCAPE_LENGTHS[escaped], None
+    if escaped == 'N':
+        end = pattern.find('}', i)
+        return (end + 1 if end != -1 else len(pattern)), None
+    if escaped.isdigit():
+        return NUMERIC_ESCAPE_PATTERN.match(pattern, i + 1).end(), None
+    return i + 2, None
+
+
+def _skip_class(pattern, i):
+    """
+    Posição após a classe de caracteres que começa em `i` ('['), ou None se ela
+    não termina. Um ']' logo no início (ou após '^') faz parte da classe.
+    """
+    i += 1
+    if pattern[i:i + 1] == '^':
+        i += 1
+    if pattern[i:i + 1] == ']':
+        i += 1
+    while i < len(pattern):
+        if pattern[i] == '\\':
+            i += 2
+        elif pattern[i] == ']':
+            return i + 1
+        else:
+            i += 1
+    return None
+
+
+def literal_runs(pattern):
+    """
+    Retorna os trechos literais obrigatórios de uma regex, na ordem; o primeiro
+    é o prefixo literal ('' se a regex não começa com um literal).
+    Análise conservadora: só considera trechos fora de grupos e classes e
+    desiste (retorna ['']) de regex com alternância (|), flags embutidas ou
+    classes sem fim.
+    """
+    if re.search(r'(?<!\\)(?:\\\\)*\|', pattern) or '(?' in pattern:
+        return ['']
+
+    runs = []
+    current = []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i, literal = _skip_escape(pattern, i)
+            if depth == 0 and literal is not None:
+                current.append(literal)
+                continue
+            runs.append(''.join(current))
+            current = []
+            # \d, \w, \b, \x41, ...: ocupam uma posição, mas não entram no trecho
+            if literal is None:
+                i = _skip_quantifier(pattern, i)
+            continue
+        if char in '*?{':
+            # O caractere anterior é opcional ou repetido um número variável de vezes
+            if current:
+                current.pop()
+            runs.append(''.join(current))
+            current = []
+            if char == '{':
+                i = pattern.find('}', i) + 1 or len(pattern)
+            else:
+                i += 1
+            continue
+        if char == '+':
+            # O caractere anterior aparece pelo menos uma vez, mas o trecho termina nele
+            runs.append(''.join(current))
+            current = []
+            i += 1
+            continue
+        if char == '[':
+            runs.append(''.join(current))
+            current = []
+            end = _skip_class(pattern, i)
+            if end is None:
+                return ['']
+            i = _skip_quantifier(pattern, end)
+            continue
+        if char in '()':
+            runs.append(''.join(current))
+            current = []
+            depth += 1 if char == '(' else -1
+            i += 1
+            continue
+        if char in '.^$':
+            runs.append(''.join(current))
+            current = []
+            i += 1
+            continue
+        if depth == 0:
+            current.append(char)
+        i += 1
+    runs.append(''.join(current))
+    return runs
+
+
+class _Parser:
+    """Parser descendente recursivo: OR < AND (explícito ou implícito) < NOT < termo."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(f"Consulta inválida: '{self.peek()}' inesperado")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == 'OR':
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.peek() in ('AND', 'NOT', 'term', '('):
+            if self.peek() == 'AND':
+                self.take()
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_not(self):
+        if self.peek() == 'NOT':
+            self.take()
+            return Not(self.parse_not())
+        return self.parse_term()
+
+    def parse_term(self):
+        kind = self.peek()
+        if kind == '(':
+            self.take()
+            node = self.parse_or()
+            if self.peek() != ')':
+                raise ValueError("Consulta inválida: falta ')'")
+            self.take()
+            return node
+        if kind == 'term':
+            return self.take()[1]
+        raise ValueError(f"Consulta inválida: esperado um termo, encontrado '{kind or 'fim da consulta'}'")
+
+
+def parse_query(text, prefilter=True):
+    """Converte o texto da consulta em uma árvore de predicados. Levanta ValueError."""
+    tokens = tokenize(text, prefilter)
+    if not tokens:
+        return None
+    return _Parser(tokens).parse()
+
+
+def optimize(node):
+    """
+    Simplifica a árvore (achata AND/OR aninhados, une níveis em um OR, remove
+    NOT duplo) e ordena os filhos de cada AND/OR pelo custo estimado.
+    """
+    if isinstance(node, Not):
+        child = optimize(node.child)
+        return child.child if isinstance(child, Not) else Not(child)
+    if not isinstance(node, (And, Or)):
+        return node
+
+    kind = type(node)
+    children = []
+    for child in map(optimize, node.children):
+        children.extend(child.children if isinstance(child, kind) else [child])
+
+    if kind is Or:
+        # level:ERROR OR level:FATAL vira um único teste (e pode usar o índice)
+        levels = [child for child in children if isinstance(child, Level)]
+        if len(levels) > 1:
+            merged = Level(dict.fromkeys(level for child in levels for level in child.levels))
+            children = [child for child in children if not isinstance(child, Level)] + [merged]
+
+    if len(children) == 1:
+        return children[0]
+    result = kind(children)
+    result.order()
+    return result
+
+
+class QueryPlan:
+    """
+    Plano compilado de uma requisição: níveis lidos pelo índice (`levels`) e a
+    função `matches(linha em bytes)`, composta uma vez com os predicados na
+    ordem de avaliação. `matches_parsed(linha em bytes, timestamp)` faz o mesmo
+    reaproveitando um timestamp já extraído da linha.
+    """
+
+    def __init__(self, levels, predicate):
+        self.levels = levels
+        self.predicate = predicate
+        if predicate is None:
+            self.matches = lambda raw: True
+            self.matches_parsed = lambda raw, timestamp: True
+        else:
+            matches_line = predicate.compile()
+            self.matches = lambda raw: matches_line(_Line(raw))
+            self.matches_parsed = lambda raw, timestamp: matches_line(_Line(raw, timestamp))
+
+    def describe(self):
+        """Descrição legível do plano, na ordem de avaliação."""
+        parts = []
+        if self.levels:
+            parts.append(f"índice de níveis({','.join(self.levels)})")
+        if self.predicate is not None:
+            parts.append(self.predicate.describe())
+        return ' -> '.join(parts) or 'todas as linhas'
+
+
+def compile_plan(query='', search='', start_time=None, end_time=None, levels=(), extra=(), planned=True):
+    """
+    Compila os filtros de uma requisição em um QueryPlan: a consulta `query`
+    (sintaxe q=), a busca simples `search`, o intervalo de data/hora, os níveis
+    do parâmetro level= e predicados adicionais (`extra`). Com planned=False,
+    mantém a ordem escrita, sem pré-filtros nem uso do índice para a consulta
+    (usado para comparar planos em bench_query.py).
+    Levanta ValueError para consultas inválidas.
+    """
+    conjuncts = []
+    if search:
+        conjuncts.append(Literal(search))
+    if query:
+        node = parse_query(query, prefilter=planned)
+        if node is not None:
+            conjuncts.append(node)
+    if start_time or end_time:
+        conjuncts.append(TimeRange(start_time, end_time))
+    conjuncts.extend(extra)
+
+    if not planned:
+        predicate = And(conjuncts) if len(conjuncts) > 1 else (conjuncts[0] if conjuncts else None)
+        return QueryPlan(tuple(levels), predicate)
+
+    predicate = optimize(And(conjuncts)) if conjuncts else None
+    conjuncts = predicate.children if isinstance(predicate, And) else ([predicate] if predicate else [])
+
+    # Usar o índice para o filtro de nível mais seletivo entre o parâmetro level=
+    # e os níveis exigidos pela consulta; os demais continuam como predicados
+    candidates = [child for child in conjuncts
+                  if isinstance(child, Level) and child.selectivity <= INDEX_MAX_SELECTIVITY]
+    if levels:
+        candidates.append(Level(levels))
+        conjuncts.append(candidates[-1])
+    index_levels = ()
+    if candidates:
+        chosen = min(candidates, key=lambda child: child.selectivity)
+        conjuncts.remove(chosen)
+        index_levels = chosen.levels
+
+    if not conjuncts:
+        return QueryPlan(index_levels, None)
+    predicate = conjuncts[0] if len(conjuncts) == 1 else And(conjuncts)
+    if isinstance(predicate, And):
+        predicate.order()
+    return QueryPlan(index_levels, predicate)
+
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Leitura de arquivos de log por offsets (em bytes) para o PM2 Log Viewer.
+Permite ler pequenas janelas de linhas ao redor de uma posição do arquivo
+sem carregá-lo inteiro na memória.
+"""
+import zlib
+from itertools import islice
+
+# Tamanho dos blocos lidos ao percorrer o arquivo de trás para frente
+BLOCK_SIZE = 64 * 1024
+# Quantidade de bytes usados para verificar se o conteúdo de um arquivo mudou
+FINGERPRINT_SIZE = 64
+
+
+def is_line_start(f, offset):
+    """Verifica se o offset aponta para o início de uma linha."""
+    if offset == 0:
+        return True
+    f.seek(offset - 1)
+    return f.read(1) == b'\n'
+
+
+def iter_lines_forward(f, offset):
+    """
+    Percorre as linhas a partir do offset (que deve ser início de linha),
+    retornando (offset, linha em bytes).
+    """
+    f.seek(offset)
+    for line in f:
+        yield offset, line
+        offset += len(line)
+
+
+def iter_lines_backward(f, offset, stop=0):
+    """
+    Percorre as linhas anteriores ao offset, da mais recente para a mais antiga,
+    sem passar de `stop` (ambos devem ser inícios de linha). Lê o arquivo em
+    blocos de trás para frente, retornando (offset, linha em bytes).
+    """
+    pos = offset
+    carry = b''
+    while pos > stop:
+        size = min(BLOCK_SIZE, pos - stop)
+        pos -= size
+        f.seek(pos)
+        data = f.read(size) + carry
+
+        end = len(data)
+        while True:
+            # Quebra de linha que termina a linha anterior à atual
+            newline = data.rfind(b'\n', 0, end - 1)
+            if newline == -1:
+                break
+            yield pos + newline + 1, data[newline + 1:end]
+            end = newline + 1
+        # Início de uma linha que pode começar em um bloco anterior
+        carry = data[:end]
+
+    if carry:
+        yield stop, carry
+
+
+def read_lines_from(f, offset, count):
+    """
+    Lê até `count` linhas a partir do offset (que deve ser início de linha).
+    Retorna uma lista de (offset, linha em bytes).
+    """
+    if count <= 0:
+        return []
+    return list(islice(iter_lines_forward(f, offset), count))
+
+
+def read_lines_before(f, offset, count, stop=0):
+    """
+    Lê até `count` linhas imediatamente anteriores ao offset, sem passar de `stop`.
+    Retorna uma lista de (offset, linha em bytes) em ordem crescente.
+    """
+    if count <= 0:
+        return []
+    lines = list(islice(iter_lines_backward(f, offset, stop), count))
+    lines.reverse()
+    return lines
+
+
+def read_context(f, offset, before, after):
+    """
+    Lê a janela de linhas ao redor do offset (início de linha): `before` linhas
+    anteriores a ele e `after` linhas a partir dele.
+    """
+    return read_lines_before(f, offset, before) + read_lines_from(f, offset, after)
+
+
+def build_context_groups(f, match_offsets, context):
+    """
+    Monta as janelas de contexto (como `grep -C`) para os offsets das linhas
+    encontradas, em ordem crescente. Janelas sobrepostas ou adjacentes são
+    unidas, e cada trecho do arquivo é lido uma única vez.
+    Retorna uma lista de dicts com 'start', 'end', 'matches' e 'lines'.
+    """
+    groups = []
+    for match in match_offsets:
+        group = groups[-1] if groups else None
+
+        if group is None or match >= group['end']:
+            stop = group['end'] if group else 0
+            before = read_lines_before(f, match, context, stop)
+            first = before[0][0] if before else match
+            if group is None or first > stop:
+                group = {'start': first, 'end': first, 'matches': [], 'lines': []}
+                groups.append(group)
+            group['lines'].extend(before)
+            group['lines'].extend(read_lines_from(f, match, context + 1))
+        else:
+            # A linha já faz parte do contexto do grupo atual: estender o final
+            following = 0
+            for offset, _ in reversed(group['lines']):
+                if offset <= match:
+                    break
+                following += 1
+            group['lines'].extend(read_lines_from(f, group['end'], context - following))
+
+        group['matches'].append(match)
+        last_offset, last_line = group['lines'][-1]
+        group['end'] = last_offset + len(last_line)
+
+    return groups
+
+
+def find_offset_for_time(f, size, target, extract_timestamp):
+    """
+    Busca binária pelo offset da primeira linha com timestamp >= target,
+    assumindo que os timestamps do arquivo são crescentes. Linhas sem timestamp
+    são ignoradas. Retorna `size` se nenhuma linha for posterior ao target.
+    """
+    lo, hi = 0, size
+    result = size
+    while lo < hi:
+        mid = (lo + hi) // 2
+
+        # Primeiro início de linha a partir de mid
+        if mid == 0:
+            start = 0
+        else:
+            f.seek(mid - 1)
+            f.readline()
+            start = f.tell()
+
+        # Primeira linha com timestamp entre start e hi
+        found = None
+        for offset, line in iter_lines_forward(f, start):
+            if offset >= hi:
+                break
+            timestamp = extract_timestamp(line.decode('utf-8', errors='ignore'))
+            if timestamp:
+                found = (offset, offset + len(line), timestamp)
+                break
+
+        if found is None:
+            hi = mid
+        elif found[2] >= target:
+            result = found[0]
+            hi = mid
+        else:
+            lo = found[1]
+    return result
+
+
+def file_identity(stat_result):
+    """Identidade física do arquivo (dispositivo, inode), preservada em renomeações."""
+    return (stat_result.st_dev, stat_result.st_ino)
+
+
+def fingerprint(f, offset):
+    """
+    Checksum dos bytes imediatamente anteriores ao offset. Permite verificar se o
+    conteúdo já lido continua o mesmo (ex: arquivo truncado e reescrito).
+    """
+    start = max(0, offset - FINGERPRINT_SIZE)
+    f.seek(start)
+    return zlib.crc32(f.read(offset - start))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Streams lógicos de log para o PM2 Log Viewer.
+Trata o arquivo atual de um app e os arquivos gerados pela rotação
+(pm2-logrotate: app-out__2024-01-01_00-00-00.log) como uma única sequência,
+identificando cada arquivo pelo inode para sobreviver a renomeações e truncamentos.
+"""
+import os
+import base64
+
+from log_index import get_level_index
+from log_reader import file_identity, fingerprint, is_line_start, iter_lines_backward, iter_lines_forward
+
+# Separador usado pelo pm2-logrotate entre o nome do arquivo e a data da rotação
+ROTATION_SEPARATOR = '__'
+
+
+class LogSegment:
+    """Um arquivo físico do stream, com identidade e tamanho lidos na descoberta."""
+
+    def __init__(self, path):
+        stat_result = os.stat(path)
+        self.path = path
+        self.name = os.path.basename(path)
+        self.identity = file_identity(stat_result)
+        self.size = stat_result.st_size
+
+
+class LogStream:
+    """
+    Arquivo atual de um app mais seus arquivos rotacionados, do mais antigo
+    para o mais recente. Os arquivos são descobertos a cada acesso, então
+    rotações e truncamentos feitos entre requisições são sempre percebidos.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.segments = self._discover()
+
+    def _discover(self):
+        """Lista os arquivos do stream ordenados do mais antigo para o mais recente."""
+        directory, name = os.path.split(self.path)
+        prefix = name[:-len('.log')] + ROTATION_SEPARATOR
+
+        # A data no nome (YYYY-MM-DD_HH-mm-ss) ordena cronologicamente
+        rotated = sorted(f for f in os.listdir(directory or '.')
+                         if f.startswith(prefix) and f.endswith('.log'))
+
+        segments = []
+        for filename in rotated + [name]:
+            try:
+                segments.append(LogSegment(os.path.join(directory, filename)))
+            except OSError:
+                # Removido pela rotação entre a listagem e o stat
+                continue
+        return segments
+
+    def iter_lines_backward(self, position=None, since=None, extract_timestamp=None):
+        """
+        Percorre as linhas do stream da mais recente para a mais antiga a partir de
+        `position` (índice do segmento, offset), passando para os arquivos
+        rotacionados apenas quando necessário. Com `since`, não abre os arquivos
+        rotacionados que só têm linhas anteriores a esse instante.
+        Retorna (segmento, offset, linha em bytes).
+        """
+        index, offset = position if position else (len(self.segments) - 1, None)
+        for segment in reversed(self.segments[:index + 1]):
+            with open(segment.path, 'rb') as f:
+                start = segment.size if offset is None else offset
+                for line_offset, line in iter_lines_backward(f, start):
+                    yield segment, line_offset, line
+                if since and self._starts_before(f, since, extract_timestamp):
+                    return
+            offset = None
+
+    def iter_lines_forward(self, position=None):
+        """
+        Percorre as linhas do stream da mais antiga para a mais recente a partir de
+        `position` (índice do segmento, offset). Retorna (segmento, offset, linha em bytes).
+        """
+        index, offset = position if position else (0, 0)
+        for segment in self.segments[index:]:
+            with open(segment.path, 'rb') as f:
+                for line_offset, line in iter_lines_forward(f, offset):
+                    if line_offset >= segment.size:
+                        break
+                    yield segment, line_offset, line
+            offset = 0
+
+    def iter_level_lines(self, levels, reverse=True, position=None, since=None, extract_timestamp=None):
+        """
+        Como iter_lines_backward/iter_lines_forward, mas lendo apenas as linhas
+        dos níveis pedidos através do índice de níveis de cada segmento.
+        """
+        if reverse:
+            index, offset = position if position else (len(self.segments) - 1, None)
+            segments = reversed(self.segments[:index + 1])
+        else:
+            index, offset = position if position else (0, 0)
+            segments = self.segments[index:]
+
+        for segment in segments:
+            level_index = get_level_index(segment.path)
+            for line_offset, line in level_index.iter_lines(levels, reverse, offset):
+                yield segment, line_offset, line
+            if reverse and since:
+                with open(segment.path, 'rb') as f:
+                    if self._starts_before(f, since, extract_timestamp):
+                        return
+            offset = None if reverse else 0
+
+    @staticmethod
+    def _starts_before(f, since, extract_timestamp):
+        """
+        Verifica se a primeira linha com timestamp do arquivo é anterior a `since`.
+        Nesse caso, os arquivos rotacionados mais antigos não têm linhas no intervalo.
+        """
+        for _, line in iter_lines_forward(f, 0):
+            timestamp = extract_timestamp(line.decode('utf-8', errors='ignore'))
+            if timestamp:
+                return timestamp < since
+        return False
+
+    def find_time(self, target, find_offset):
+        """
+        Localiza a primeira linha com timestamp >= target em todo o stream.
+        `find_offset(f, size, target)` faz a busca dentro de um segmento.
+        Retorna a posição (índice do segmento, offset).
+        """
+        for index, segment in enumerate(self.segments):
+            with open(segment.path, 'rb') as f:
+                offset = find_offset(f, segment.size, target)
+            if offset < segment.size:
+                return index, offset
+        return self.end_position()
+
+    def end_position(self):
+        """Posição logo após a última linha do stream."""
+        return len(self.segments) - 1, self.segments[-1].size
+
+    def encode_cursor(self, position):
+        """
+        Gera um cursor opaco para uma posição do stream. O cursor guarda a
+        identidade do arquivo e um checksum dos bytes anteriores ao offset, para
+        continuar válido depois de rotações.
+        """
+        index, offset = position
+        segment = self.segments[index]
+        with open(segment.path, 'rb') as f:
+            checksum = fingerprint(f, offset)
+        device, inode = segment.identity
+        raw = f"{device}:{inode}:{offset}:{checksum}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def resolve_cursor(self, cursor):
+        """
+        Converte um cursor de volta em posição (índice do segmento, offset).
+        Procura primeiro o arquivo com o mesmo inode; se ele foi truncado ou
+        reescrito, procura a cópia rotacionada com o mesmo conteúdo.
+        Levanta ValueError se o cursor for inválido ou não existir mais.
+        """
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(cursor + padding).decode()
+            device, inode, offset, checksum = (int(part) for part in raw.split(':'))
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Cursor inválido")
+
+        candidates = sorted(range(len(self.segments)),
+                            key=lambda i: (self.segments[i].identity != (device, inode), -i))
+        for index in candidates:
+            segment = self.segments[index]
+            if offset > segment.size:
+                continue
+            with open(segment.path, 'rb') as f:
+                if is_line_start(f, offset) and fingerprint(f, offset) == checksum:
+                    return index, offset
+        raise ValueError("Cursor expirado: o arquivo foi truncado ou removido")
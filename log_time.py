@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Formatos de timestamp reconhecidos nas linhas de log do PM2 Log Viewer.
+"""
+import re
+import json
+from datetime import datetime
+
+MONTHS = {name: number for number, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), 1)}
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+def _parse_numeric(day, month, year, hour, minute, second):
+    return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second))
+
+
+def _parse_12h(month, day, year, hour, minute, second, period):
+    hour = int(hour)
+    if not 1 <= hour <= 12:
+        raise ValueError(f"Hora inválida: {hour}")
+    hour = hour % 12 + (12 if period == 'PM' else 0)
+    return datetime(int(year), int(month), int(day), hour, int(minute), int(second))
+
+
+def _parse_http_date(weekday, day, month, year, hour, minute, second):
+    month_number = MONTHS.get(month.lower())
+    if weekday.lower() not in WEEKDAYS or month_number is None:
+        raise ValueError(f"Data inválida: {weekday}, {month}")
+    return datetime(int(year), month_number, int(day), int(hour), int(minute), int(second))
+
+
+def _parse_iso(year, month, day, hour, minute, second):
+    return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second))
+
+
+# (nome no formato de wire, regex, conversão), na ordem em que são testados.
+# O grupo 1 é o texto do timestamp; os demais grupos são passados à conversão,
+# que valida os campos como o strptime faria, mas sem o custo dele.
+TIMESTAMP_FORMATS = (
+    # Formato: [DD-MM-YYYY HH:MM:SS] (usado pelo frontend)
+    ('DD-MM-YYYY HH:mm:ss',
+     re.compile(r'\[((\d{2})-(\d{2})-(\d{4}) (\d{2}):(\d{2}):(\d{2}))\]'), _parse_numeric),
+    # Formato: M/D/YYYY H:MM:SS AM/PM (logs do tipo frontend)
+    ('M/D/YYYY h:mm:ss A',
+     re.compile(r'((\d{1,2})/(\d{1,2})/(\d{4}) (\d{1,2}):(\d{2}):(\d{2}) (AM|PM))'), _parse_12h),
+    # Formato: Day, DD Mon YYYY HH:MM:SS GMT (logs de erro)
+    ('ddd, DD MMM YYYY HH:mm:ss [GMT]',
+     re.compile(r'((\w{3}), (\d{2}) (\w{3}) (\d{4}) (\d{2}):(\d{2}):(\d{2}) GMT)'), _parse_http_date),
+    # Formato: YYYY-MM-DD HH:MM:SS (ISO format)
+    ('YYYY-MM-DD HH:mm:ss',
+     re.compile(r'((\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2}):(\d{2}))'), _parse_iso),
+)
+
+
+def find_timestamp(line):
+    """
+    Localiza o timestamp da linha, suportando múltiplos formatos.
+    Retorna (datetime, início, fim, índice do formato) com a posição do texto do
+    timestamp na linha, ou None. Timestamps de logs JSON não têm posição nem formato.
+    """
+    for format_index, (_, pattern, parse) in enumerate(TIMESTAMP_FORMATS):
+        match = pattern.search(line)
+        if match:
+            try:
+                return parse(*match.groups()[1:]), match.start(1), match.end(1), format_index
+            except ValueError:
+                pass
+
+    # Formato JSON com timestamp Unix (logs do PM2 metrics)
+    try:
+        if line.strip().startswith('{'):
+            data = json.loads(line.strip())
+            if 'time' in data:
+                return datetime.fromtimestamp(data['time'] / 1000), None, None, None  # Converte de ms para s
+    except (json.JSONDecodeError, ValueError, KeyError, TypeError):
+        pass
+
+    return None
+
+
+def extract_timestamp_from_line(line):
+    """
+    Extrai timestamp de uma linha de log, suportando múltiplos formatos.
+    Retorna um datetime object ou None se não encontrar timestamp válido.
+    """
+    found = find_timestamp(line)
+    return found[0] if found else None
+
+
+def format_timestamp(timestamp, format_index):
+    """Reescreve o timestamp exatamente no formato em que aparece na linha."""
+    if format_index == 0:
+        return timestamp.strftime('%d-%m-%Y %H:%M:%S')
+    if format_index == 1:
+        hour = timestamp.hour % 12 or 12
+        period = 'PM' if timestamp.hour >= 12 else 'AM'
+        return f"{timestamp.month}/{timestamp.day}/{timestamp.year} {hour}:{timestamp:%M:%S} {period}"
+    if format_index == 2:
+        return timestamp.strftime('%a, %d %b %Y %H:%M:%S GMT')
+    return timestamp.strftime('%Y-%m-%d %H:%M:%S')
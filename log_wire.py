@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Formatos compactos das respostas de /file/ para o PM2 Log Viewer.
+Em vez de uma lista de strings, as linhas são enviadas em colunas paralelas
+(timestamp em epoch, nível, cabeçalho e mensagem), com os cabeçalhos repetidos
+(prefixo do app, timestamp e nível) codificados em dicionário. O esquema está
+documentado no README, seção "Formato compacto".
+"""
+import re
+import json
+import struct
+import calendar
+
+from log_index import LEVELS
+from log_time import TIMESTAMP_FORMATS, find_timestamp, format_timestamp
+
+WIRE_VERSION = 1
+# Marca a posição do timestamp no texto do cabeçalho
+TIMESTAMP_PLACEHOLDER = '\x00'
+# Distância máxima do início da linha para o timestamp fazer parte do cabeçalho
+MAX_HEAD_PREFIX = 40
+# Caracteres entre prefixo, timestamp, nível e mensagem que pertencem ao cabeçalho
+HEAD_SEPARATORS = ' \t[]()|:-'
+
+LEVEL_PATTERN = re.compile(r'\b(' + '|'.join(LEVELS) + r')\b')
+
+# Frame binário: assinatura, tamanho do cabeçalho JSON e um registro por linha
+# (epoch int64, nível uint8, cabeçalho uint16, tamanho da mensagem uint32)
+BINARY_MAGIC = b'PLV1'
+BINARY_HEADER = struct.Struct('<I')
+BINARY_RECORD = struct.Struct('<qBHI')
+BINARY_NO_TIMESTAMP = -2 ** 63
+BINARY_NO_LEVEL = 0xFF
+
+
+def split_line(line):
+    """
+    Separa uma linha já limpa em cabeçalho e mensagem.
+    Retorna (epoch, nível, texto do cabeçalho, formato do timestamp, mensagem).
+    O timestamp só é trocado por TIMESTAMP_PLACEHOLDER no cabeçalho quando
+    pode ser reescrito exatamente a partir do epoch e do formato.
+    """
+    epoch = None
+    level = None
+    head_end = 0
+    timestamp_span = None
+    timestamp_format = None
+
+    found = find_timestamp(line)
+    # Apenas timestamps escritos no texto: o `time` dos logs JSON é convertido
+    # para o horário local do servidor e não pode ser tratado como UTC
+    if found and found[3] is not None:
+        timestamp, start, end, format_index = found
+        # Epoch do horário escrito na linha, sem fuso (tratado como UTC)
+        epoch = calendar.timegm(timestamp.timetuple())
+        if (start <= MAX_HEAD_PREFIX
+                and format_timestamp(timestamp, format_index) == line[start:end]):
+            timestamp_span = (start, end)
+            timestamp_format = format_index
+            head_end = end
+
+    match = LEVEL_PATTERN.search(line)
+    if match:
+        level = LEVELS.index(match[1])
+        # O nível faz parte do cabeçalho quando vem logo após o timestamp
+        if timestamp_span and not line[head_end:match.start()].strip(HEAD_SEPARATORS):
+            head_end = match.end()
+
+    if head_end:
+        while head_end < len(line) and line[head_end] in HEAD_SEPARATORS:
+            head_end += 1
+
+    head = line[:head_end]
+    if timestamp_span:
+        start, end = timestamp_span
+        head = head[:start] + TIMESTAMP_PLACEHOLDER + head[end:]
+    return epoch, level, head, timestamp_format, line[head_end:]
+
+
+def encode_compact(lines):
+    """Codifica as linhas (mais recentes primeiro) no formato colunar em JSON."""
+    heads = {}
+    columns = {'ts': [], 'level': [], 'head': [], 'msg': []}
+    for line in lines:
+        epoch, level, head, timestamp_format, message = split_line(line)
+        head_index = heads.setdefault((head, timestamp_format), len(heads))
+        columns['ts'].append(epoch)
+        columns['level'].append(level)
+        columns['head'].append(head_index)
+        columns['msg'].append(message)
+
+    return {
+        'v': WIRE_VERSION,
+        'formats': [name for name, _, _ in TIMESTAMP_FORMATS],
+        'levels': list(LEVELS),
+        'heads': [[head, timestamp_format] for head, timestamp_format in heads],
+        **columns
+    }
+
+
+def encode_binary(lines, extra=None):
+    """
+    Codifica as linhas no frame binário: BINARY_MAGIC, cabeçalho JSON prefixado
+    pelo tamanho (dicionários e campos de `extra`, ex: cursores) e um registro
+    de tamanho fixo seguido da mensagem em UTF-8 para cada linha.
+    """
+    compact = encode_compact(lines)
+    header = {key: compact[key] for key in ('v', 'formats', 'levels', 'heads')}
+    header['count'] = len(lines)
+    header.update(extra or {})
+    header_bytes = json.dumps(header).encode()
+
+    parts = [BINARY_MAGIC, BINARY_HEADER.pack(len(header_bytes)), header_bytes]
+    for epoch, level, head, message in zip(compact['ts'], compact['level'], compact['head'], compact['msg']):
+        message_bytes = message.encode()
+        parts.append(BINARY_RECORD.pack(
+            BINARY_NO_TIMESTAMP if epoch is None else epoch,
+            BINARY_NO_LEVEL if level is None else level,
+            head,
+            len(message_bytes)))
+        parts.append(message_bytes)
+    return b''.join(parts)
@@ -6,6 +6,14 @@ from datetime import datetime
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 from http import cookies
 import urllib.parse
+from log_cache import TailCache
+from log_cluster import TemplateClusterer, mask_line, template_id
+from log_index import parse_levels
+from log_query import TextPredicate, compile_plan
+from log_reader import build_context_groups, find_offset_for_time, read_context
+from log_stream import LogStream
+from log_time import extract_timestamp_from_line
+from log_wire import encode_binary, encode_compact
 
 # Importar autenticação se habilitada
 AUTH_ENABLED = os.environ.get('AUTH_ENABLED', 'false').lower() == 'true'
@@ -20,74 +28,76 @@ if AUTH_ENABLED:
 # Diretório onde estão os logs (configurável via variável de ambiente)
 LOG_DIR = os.environ.get('LOG_DIR', '/app/logs')
 
-def extract_timestamp_from_line(line):
+def parse_datetime_input(datetime_str):
     """
-    Extrai timestamp de uma linha de log, suportando múltiplos formatos.
-    Retorna um datetime object ou None se não encontrar timestamp válido.
+    Converte string de datetime-local do frontend para datetime object.
+    Formato esperado: YYYY-MM-DDTHH:MM ou YYYY-MM-DD HH:MM:SS
     """
-    # Formato: [DD-MM-YYYY HH:MM:SS] (usado pelo frontend)
-    match = re.search(r'\[(\d{2}-\d{2}-\d{4} \d{2}:\d{2}:\d{2})\]', line)
-    if match:
-        try:
-            return datetime.strptime(match[1], '%d-%m-%Y %H:%M:%S')
-        except ValueError:
-            pass
-    
-    # Formato: M/D/YYYY H:MM:SS AM/PM (logs do tipo frontend)
-    match = re.search(r'(\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}:\d{2} (?:AM|PM))', line)
-    if match:
-        try:
-            return datetime.strptime(match[1], '%m/%d/%Y %I:%M:%S %p')
-        except ValueError:
-            pass
-    
-    # Formato: Day, DD Mon YYYY HH:MM:SS GMT (logs de erro)
-    match = re.search(r'(\w{3}, \d{2} \w{3} \d{4} \d{2}:\d{2}:\d{2} GMT)', line)
-    if match:
-        try:
-            return datetime.strptime(match[1], '%a, %d %b %Y %H:%M:%S GMT')
-        except ValueError:
-            pass
+    if not datetime_str:
+        return None
     
-    # Formato: YYYY-MM-DD HH:MM:SS (ISO format)
-    match = re.search(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})', line)
-    if match:
+    # Formatos: YYYY-MM-DDTHH:MM (datetime-local input), com ou sem segundos,
+    # ou YYYY-MM-DD HH:MM:SS (já normalizado)
+    for fmt in ('%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'):
         try:
-            return datetime.strptime(match[1], '%Y-%m-%d %H:%M:%S')
+            return datetime.strptime(datetime_str, fmt)
         except ValueError:
             pass
-    
-    # Formato JSON com timestamp Unix (logs do PM2 metrics)
-    try:
-        if line.strip().startswith('{'):
-            data = json.loads(line.strip())
-            if 'time' in data:
-                return datetime.fromtimestamp(data['time'] / 1000)  # Converte de ms para s
-    except (json.JSONDecodeError, ValueError, KeyError):
-        pass
-    
     return None
 
-def parse_datetime_input(datetime_str):
+# Limite de linhas por consulta e de linhas de contexto ao redor de cada resultado
+MAX_LINES = 5000
+MAX_CONTEXT = 100
+# Tamanho padrão das páginas na paginação por cursor
+DEFAULT_PAGE_SIZE = 100
+# Linhas mais recentes consideradas no modo collapse (agrupamento por template)
+MAX_COLLAPSE_LINES = 100000
+# Formatos de resposta para listas de linhas (ver log_wire.py)
+WIRE_FORMATS = ('json', 'compact', 'binary')
+# Custo (em buscas de literal) e seletividade estimados do filtro por template:
+# mascarar a linha é a verificação mais cara, então fica por último no plano
+TEMPLATE_FILTER_COST = 75
+TEMPLATE_FILTER_SELECTIVITY = 0.1
+
+# Final dos arquivos mais acessados mantido em memória (ver log_cache.py):
+# limite total de memória, trecho final de cada arquivo, quantidade de arquivos
+# escolhidos pelos acessos e arquivos sempre em memória (separados por vírgula)
+TAIL_CACHE_MB = float(os.environ.get('TAIL_CACHE_MB', '64'))
+TAIL_CACHE_FILE_MB = float(os.environ.get('TAIL_CACHE_FILE_MB', '8'))
+TAIL_CACHE_HOT_FILES = int(os.environ.get('TAIL_CACHE_HOT_FILES', '4'))
+TAIL_CACHE_FILES = [name.strip() for name in os.environ.get('TAIL_CACHE_FILES', '').split(',') if name.strip()]
+
+def parse_int_param(query, name, default, maximum=None):
     """
-    Converte string de datetime-local do frontend para datetime object.
-    Formato esperado: YYYY-MM-DDTHH:MM ou YYYY-MM-DD HH:MM:SS
+    Lê um parâmetro inteiro não negativo da query string.
+    Levanta ValueError se o valor for inválido.
     """
-    if not datetime_str:
-        return None
-    
-    # Remover segundos se vier do formato normalizado
-    datetime_str = datetime_str.replace(':00', '', 1) if datetime_str.endswith(':00') else datetime_str
-    
-    try:
-        # Formato: YYYY-MM-DDTHH:MM (datetime-local input)
-        if 'T' in datetime_str:
-            return datetime.strptime(datetime_str, '%Y-%m-%dT%H:%M')
-        # Formato: YYYY-MM-DD HH:MM:SS (já normalizado)
-        else:
-            return datetime.strptime(datetime_str, '%Y-%m-%d %H:%M:%S')
-    except ValueError:
-        return None
+    value = query.get(name, [''])[0]
+    if not value:
+        return default
+    number = int(value)
+    if number < 0:
+        raise ValueError(f"Parâmetro inválido: {name}")
+    if maximum is not None:
+        number = min(number, maximum)
+    return number
+
+def clean_log_line(line):
+    """Remove códigos ANSI e caracteres especiais de uma linha."""
+    return re.sub(r'\x1b\[[0-9;]*m', '', line.rstrip().replace('\r', ''))
+
+tail_cache = None
+if TAIL_CACHE_MB > 0:
+    tail_cache = TailCache(
+        int(TAIL_CACHE_MB * 1024 * 1024), int(TAIL_CACHE_FILE_MB * 1024 * 1024), TAIL_CACHE_HOT_FILES,
+        [os.path.join(LOG_DIR, name) for name in TAIL_CACHE_FILES], clean_log_line)
+
+def template_predicate(template):
+    """Predicado do plano que mantém apenas as linhas de um template (modo collapse)."""
+    return TextPredicate(
+        f"template({template})",
+        lambda line: template_id(mask_line(clean_log_line(line))) == template,
+        TEMPLATE_FILTER_COST, TEMPLATE_FILTER_SELECTIVITY)
 
 class LogServer(SimpleHTTPRequestHandler):
     def _get_session_id(self):
@@ -108,58 +118,211 @@ class LogServer(SimpleHTTPRequestHandler):
         print(f"DEBUG: Cookie header presente mas sem session_id: {cookie_header}")
         return None
     
-    def _process_file_efficiently(self, full_path, search, start_time, end_time):
+    def _iter_stream_lines(self, stream, levels, reverse=True, position=None, since=None):
         """
-        Processa arquivo de log de forma eficiente, linha por linha,
-        para evitar carregar arquivos grandes na memória.
+        Percorre as linhas do stream (arquivo atual e rotacionados), usando o
+        índice de níveis quando há filtro de nível. Retorna (segmento, offset, linha em bytes).
+        """
+        if levels:
+            return stream.iter_level_lines(levels, reverse, position, since, extract_timestamp_from_line)
+        if reverse:
+            return stream.iter_lines_backward(position, since, extract_timestamp_from_line)
+        return stream.iter_lines_forward(position)
+    
+    def _iter_matches(self, stream, plan, reverse=True, position=None, since=None, every_line=False):
+        """
+        Aplica o plano às linhas do stream, lendo do cache em memória o trecho
+        final do arquivo atual quando ele está carregado. Retorna (segmento,
+        offset, linha em bytes, linha limpa) dos resultados; com `every_line`,
+        também as demais linhas percorridas, com linha limpa None.
+        """
+        tail = tail_cache.lookup(stream) if tail_cache else None
+        if tail is None:
+            for segment, offset, raw_line in self._iter_stream_lines(stream, plan.levels, reverse, position, since):
+                if plan.matches(raw_line):
+                    yield segment, offset, raw_line, clean_log_line(raw_line.decode('utf-8', errors='ignore'))
+                elif every_line:
+                    yield segment, offset, raw_line, None
+            return
+        
+        lines = tail_cache.iter_lines(stream, tail, plan.levels, reverse, position, since)
+        for segment, offset, raw_line, line, timestamp in lines:
+            if line is None:
+                # Linha lida do disco (fora do buffer)
+                if plan.matches(raw_line):
+                    yield segment, offset, raw_line, clean_log_line(raw_line.decode('utf-8', errors='ignore'))
+                    continue
+            elif plan.matches_parsed(raw_line, timestamp):
+                yield segment, offset, raw_line, line
+                continue
+            if every_line:
+                yield segment, offset, raw_line, None
+    
+    def _process_file_lines(self, full_path, plan, start_time):
+        """
+        Retorna as linhas mais recentes que passam nos filtros (mais recentes primeiro),
+        lendo o arquivo de trás para frente e seguindo para os arquivos rotacionados
+        apenas enquanto for necessário.
         """
         lines = []
+        stream = LogStream(full_path)
         
-        try:
-            with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                # Coletar todas as linhas que passam nos filtros
-                filtered_lines = []
-                
-                for line in f:
-                    include = True
-                    
-                    # Filtro de busca por texto
-                    if search and search not in line.lower():
-                        include = False
-                    
-                    # Filtro de data/hora
-                    if include and (start_time or end_time):
-                        line_timestamp = extract_timestamp_from_line(line)
-                        if line_timestamp:
-                            # Verificar se a linha está dentro do intervalo de tempo
-                            if start_time and line_timestamp < start_time:
-                                include = False
-                            if include and end_time and line_timestamp > end_time:
-                                include = False
-                        else:
-                            # Se não conseguir extrair timestamp e há filtros de data, excluir
-                            if start_time or end_time:
-                                include = False
-                    
-                    if include:
-                        # Limpar códigos ANSI e caracteres especiais
-                        clean_line = re.sub(r'\x1b\[[0-9;]*m', '', line.rstrip().replace('\r', ''))
-                        filtered_lines.append(clean_line)
-                        
-                        # Parar se atingiu o limite
-                        if len(filtered_lines) >= 5000:
-                            break
-                
-                # Reverter a ordem (últimas primeiro) para manter compatibilidade
-                lines = list(reversed(filtered_lines))
-                
-        except Exception as e:
-            print(f"Erro ao processar arquivo eficientemente: {e}")
-            # Fallback: retornar lista vazia
-            lines = []
+        for _, _, _, line in self._iter_matches(stream, plan, since=start_time):
+            lines.append(line)
+            if len(lines) >= MAX_LINES:  # Limite para evitar sobrecarga
+                break
         
         return lines
     
+    def _process_file_collapsed(self, full_path, plan, start_time):
+        """
+        Agrupa as linhas mais recentes que passam nos filtros em templates, em uma
+        única passada. Retorna os templates (mais frequentes primeiro) com contagem,
+        primeiro/último timestamp e uma linha de exemplo.
+        """
+        stream = LogStream(full_path)
+        clusterer = TemplateClusterer()
+        
+        for _, _, _, line in self._iter_matches(stream, plan, since=start_time):
+            clusterer.add(line)
+            if clusterer.lines >= MAX_COLLAPSE_LINES:
+                break
+        
+        return {
+            'templates': clusterer.results(extract_timestamp_from_line),
+            'lines': clusterer.lines,
+            'other': clusterer.overflow,
+            'truncated': clusterer.lines >= MAX_COLLAPSE_LINES
+        }
+    
+    def _process_file_with_context(self, full_path, plan, start_time, context):
+        """
+        Retorna os grupos de linhas ao redor de cada resultado (como `grep -C`),
+        guardando apenas os offsets dos resultados e lendo pequenas janelas do
+        arquivo a partir deles.
+        """
+        stream = LogStream(full_path)
+        matches = []
+        for segment, offset, _, _ in self._iter_matches(stream, plan, since=start_time):
+            matches.append((segment, offset))
+            if len(matches) >= MAX_LINES:
+                break
+        return self._build_context_response(stream, matches, context)
+    
+    def _process_file_page(self, full_path, query, plan, start_time, context):
+        """
+        Lê uma página de resultados a partir de um cursor, na direção 'older'
+        (mais antigos) ou 'newer' (mais recentes), ou a partir da primeira linha
+        com timestamp >= `at`. O custo é o de um seek mais os bytes percorridos
+        pela página, independente da posição no arquivo; a leitura continua nos
+        arquivos rotacionados quando chega ao início ou ao fim de um deles
+        (na direção 'older', apenas nos que podem ter linhas após `start_time`).
+        Levanta ValueError para parâmetros ou cursores inválidos.
+        """
+        limit = max(1, parse_int_param(query, 'limit', DEFAULT_PAGE_SIZE, MAX_LINES))
+        direction = query.get('direction', ['older'])[0]
+        if direction not in ('older', 'newer'):
+            raise ValueError(f"Direção inválida: {direction}")
+        cursor = query.get('cursor', [''])[0]
+        at_str = query.get('at', [''])[0]
+        
+        stream = LogStream(full_path)
+        
+        # Resolver a posição inicial da página
+        if at_str:
+            at = parse_datetime_input(at_str)
+            if not at:
+                raise ValueError(f"Data/hora inválida: {at_str}")
+            position = stream.find_time(
+                at, lambda f, size, target: find_offset_for_time(f, size, target, extract_timestamp_from_line))
+            direction = 'newer'
+        elif cursor:
+            position = stream.resolve_cursor(cursor)
+        elif direction == 'older':
+            position = stream.end_position()
+        else:
+            position = (0, 0)
+        
+        reverse = direction == 'older'
+        matches = []
+        last = None
+        exhausted = True
+        since = start_time if reverse else None
+        lines = self._iter_matches(stream, plan, reverse, position, since, every_line=True)
+        for segment, line_offset, raw_line, line in lines:
+            last = (segment, line_offset, raw_line)
+            if line is not None:
+                matches.append((segment, line_offset, line))
+                if len(matches) >= limit:
+                    # Página cheia: só há próxima página se restar ao menos uma
+                    # linha nessa direção
+                    exhausted = next(lines, None) is None
+                    break
+        
+        # Limites da página: o próximo cursor continua de onde a leitura parou
+        older = newer = None
+        if reverse:
+            if not exhausted:
+                older = (stream.segments.index(last[0]), last[1])
+            if position != stream.end_position():
+                newer = position
+        else:
+            if position != (0, 0):
+                older = position
+            if not exhausted:
+                newer = (stream.segments.index(last[0]), last[1] + len(last[2]))
+        
+        if context:
+            result = self._build_context_response(
+                stream, [(segment, line_offset) for segment, line_offset, _ in matches], context)
+        else:
+            ordered = matches if reverse else reversed(matches)
+            result = {'lines': [line for _, _, line in ordered]}
+        
+        result['older'] = stream.encode_cursor(older) if older else None
+        result['newer'] = stream.encode_cursor(newer) if newer else None
+        return result
+    
+    def _build_context_response(self, stream, matches, context):
+        """
+        Monta os grupos de contexto para os resultados (segmento, offset) de cada
+        arquivo do stream. Grupos mais recentes primeiro; linhas de cada grupo em
+        ordem cronológica. Os cursores do início e do fim de cada grupo permitem
+        carregar mais contexto em /context/ mesmo após uma rotação.
+        """
+        offsets_by_path = {}
+        for segment, offset in matches:
+            offsets_by_path.setdefault(segment.path, []).append(offset)
+        
+        result = []
+        for index in range(len(stream.segments) - 1, -1, -1):
+            segment = stream.segments[index]
+            if segment.path not in offsets_by_path:
+                continue
+            with open(segment.path, 'rb') as f:
+                groups = build_context_groups(f, sorted(offsets_by_path[segment.path]), context)
+            for group in reversed(groups):
+                matched = set(group['matches'])
+                result.append({
+                    'file': segment.name,
+                    'start': group['start'],
+                    'end': group['end'],
+                    'start_cursor': stream.encode_cursor((index, group['start'])),
+                    'end_cursor': stream.encode_cursor((index, group['end'])),
+                    'lines': [self._serialize_line(offset, line, offset in matched)
+                              for offset, line in group['lines']]
+                })
+        return {'context': context, 'groups': result}
+    
+    @staticmethod
+    def _serialize_line(offset, raw_line, match=False):
+        """Converte uma linha lida por offset para o formato JSON da API."""
+        return {
+            'offset': offset,
+            'text': clean_log_line(raw_line.decode('utf-8', errors='ignore')),
+            'match': match
+        }
+    
     def _is_authenticated(self):
         """Verifica se o usuário está autenticado."""
         if not AUTH_ENABLED:
@@ -182,6 +345,30 @@ class LogServer(SimpleHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(json.dumps(data).encode())
     
+    def _send_bytes_response(self, data, content_type):
+        """Envia uma resposta já serializada."""
+        self.send_response(200)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _send_lines_response(self, lines, wire_format, extra=None):
+        """
+        Envia uma lista de linhas no formato pedido: 'json' (lista de strings, ou
+        objeto com 'lines' quando há `extra`), 'compact' (colunas em JSON) ou
+        'binary' (frame binário). `extra` traz campos adicionais, como os cursores.
+        """
+        if wire_format == 'binary':
+            self._send_bytes_response(encode_binary(lines, extra), 'application/octet-stream')
+        elif wire_format == 'compact':
+            data = json.dumps({**encode_compact(lines), **(extra or {})}, separators=(',', ':'))
+            self._send_bytes_response(data.encode(), 'application/json')
+        elif extra is not None:
+            self._send_json_response({'lines': lines, **extra})
+        else:
+            self._send_json_response(lines)
+    
     def _send_unauthorized(self):
         """Envia resposta de não autorizado."""
         self._send_json_response({'error': 'Unauthorized'}, 401)
@@ -273,6 +460,11 @@ class LogServer(SimpleHTTPRequestHandler):
                     self._send_unauthorized()
                 return
         
+        if self.path == '/api/cache':
+            # Arquivos mantidos em memória e uso de memória do cache
+            self._send_json_response(tail_cache.stats() if tail_cache else {'enabled': False})
+            return
+        
         if self.path == '/files':
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
@@ -284,68 +476,104 @@ class LogServer(SimpleHTTPRequestHandler):
             filename = urllib.parse.unquote(parsed.path[6:])
             query = urllib.parse.parse_qs(parsed.query)
             search = query.get('search', [''])[0].lower()
+            query_text = query.get('q', [''])[0]
             start_time_str = query.get('start', [''])[0]
             end_time_str = query.get('end', [''])[0]
             
+            collapse = query.get('collapse', [''])[0] in ('1', 'true')
+            template = query.get('template', [''])[0]
+            wire_format = query.get('format', ['json'])[0]
+            
             # Converter strings de tempo para datetime objects
             start_time = parse_datetime_input(start_time_str)
             end_time = parse_datetime_input(end_time_str)
             
+            try:
+                levels = parse_levels(query.get('level', []))
+                context = parse_int_param(query, 'context', 0, MAX_CONTEXT)
+                if wire_format not in WIRE_FORMATS:
+                    raise ValueError(f"Formato inválido: {wire_format}")
+                # Todos os filtros compilados em um plano, com os predicados mais baratos primeiro
+                extra = [template_predicate(template)] if template else []
+                plan = compile_plan(query_text, search, start_time, end_time, levels, extra)
+            except ValueError as e:
+                self._send_json_response({'error': str(e)}, 400)
+                return
+            
             # Construir o caminho completo do arquivo
             full_path = os.path.join(LOG_DIR, filename)
             if os.path.exists(full_path) and filename.endswith('.log'):
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                lines = []
+                # Agrupamento por template: resumo das linhas repetitivas
+                if collapse:
+                    self._send_json_response(self._process_file_collapsed(full_path, plan, start_time))
+                    return
                 
-                # Processar arquivo linha por linha para economizar memória
-                try:
-                    with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        # Ler todas as linhas, mas processar de trás para frente
-                        all_lines = f.readlines()
-                        
-                        # Processar linhas de forma reversa (últimas primeiro)
-                        for line in reversed(all_lines):
-                            include = True
-                            
-                            # Filtro de busca por texto
-                            if search and search not in line.lower():
-                                include = False
-                            
-                            # Filtro de data/hora
-                            if include and (start_time or end_time):
-                                line_timestamp = extract_timestamp_from_line(line)
-                                if line_timestamp:
-                                    # Verificar se a linha está dentro do intervalo de tempo
-                                    if start_time and line_timestamp < start_time:
-                                        include = False
-                                    if include and end_time and line_timestamp > end_time:
-                                        include = False
-                                else:
-                                    # Se não conseguir extrair timestamp e há filtros de data, excluir
-                                    if start_time or end_time:
-                                        include = False
-                            
-                            if include:
-                                # Limpar códigos ANSI e caracteres especiais
-                                clean_line = re.sub(r'\x1b\[[0-9;]*m', '', line.rstrip().replace('\r', ''))
-                                lines.append(clean_line)
-                                if len(lines) >= 5000:  # Limite para evitar sobrecarga
-                                    break
-                except MemoryError:
-                    # Se houver erro de memória, tentar abordagem mais eficiente
-                    lines = self._process_file_efficiently(full_path, search, start_time, end_time)
+                # Paginação por cursor: lê apenas os bytes da página pedida
+                if 'limit' in query or 'cursor' in query or 'at' in query:
+                    try:
+                        page = self._process_file_page(full_path, query, plan, start_time, context)
+                    except ValueError as e:
+                        self._send_json_response({'error': str(e)}, 400)
+                        return
+                    if 'lines' in page:
+                        self._send_lines_response(page.pop('lines'), wire_format, page)
+                    else:
+                        self._send_json_response(page)
+                    return
                 
-                self.wfile.write(json.dumps(lines).encode())
+                # Contexto ao redor dos resultados: ler janelas a partir dos offsets
+                if context:
+                    self._send_json_response(
+                        self._process_file_with_context(full_path, plan, start_time, context))
+                else:
+                    lines = self._process_file_lines(full_path, plan, start_time)
+                    self._send_lines_response(lines, wire_format)
             else:
                 self.send_error(404)
+        elif self.path.startswith('/context/'):
+            # Expandir o contexto de um grupo a partir de um cursor retornado por /file/
+            parsed = urllib.parse.urlparse(self.path)
+            filename = urllib.parse.unquote(parsed.path[9:])
+            query = urllib.parse.parse_qs(parsed.query)
+            
+            full_path = os.path.join(LOG_DIR, filename)
+            if not (os.path.exists(full_path) and filename.endswith('.log')):
+                self.send_error(404)
+                return
+            
+            try:
+                before = parse_int_param(query, 'before', 10, MAX_CONTEXT)
+                after = parse_int_param(query, 'after', 10, MAX_CONTEXT)
+                cursor = query.get('cursor', [''])[0]
+                if not cursor:
+                    raise ValueError("Parâmetro obrigatório: cursor")
+                # Mesma identidade e checksum dos cursores de paginação: após uma
+                # rotação, a leitura segue na cópia rotacionada ou falha com 400
+                stream = LogStream(full_path)
+                index, offset = stream.resolve_cursor(cursor)
+            except ValueError as e:
+                self._send_json_response({'error': str(e)}, 400)
+                return
+            
+            with open(stream.segments[index].path, 'rb') as f:
+                lines = read_context(f, offset, before, after)
+            
+            start = lines[0][0] if lines else offset
+            end = lines[-1][0] + len(lines[-1][1]) if lines else offset
+            self._send_json_response({
+                'file': stream.segments[index].name,
+                'lines': [self._serialize_line(line_offset, line) for line_offset, line in lines],
+                'start_cursor': stream.encode_cursor((index, start)),
+                'end_cursor': stream.encode_cursor((index, end))
+            })
         else:
             super().do_GET()
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8001))
     server = HTTPServer(('0.0.0.0', port), LogServer)
+    if tail_cache:
+        tail_cache.start()
     print(f"Servidor rodando em http://0.0.0.0:{port}")
     print("Abra index.html no navegador.")
     server.serve_forever()
\ No newline at end of file
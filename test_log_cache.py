@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Testes dos buffers em memória (log_cache.py): as respostas de /file/ devem ser
+idênticas, byte a byte, com o cache ligado e desligado, para tail, busca, q=,
+level=, intervalos de tempo, contexto, formatos e paginação por cursor, também
+depois de novas linhas, de truncamento e de rotações.
+Execute com: python -m unittest test_log_cache
+"""
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+from http.server import HTTPServer
+from unittest import mock
+
+import server
+from log_cache import TailCache
+from log_stream import LogStream
+from test_log_stream import CURRENT, ROTATED, QuietLogServer
+
+# Rotação feita durante os testes, depois de ROTATED
+ROTATED_LATER = 'app-out__2026-10-01_11-30-00.log'
+# Trecho do arquivo atual mantido em memória: menor que o arquivo, para que as
+# consultas também continuem no disco a partir do início do buffer
+BUFFER_BYTES = 96 * 1024
+# Páginas seguidas em cada direção a partir da primeira página
+MAX_PAGES = 4
+
+PARAMS = (
+    {},
+    {'search': 'timeout'},
+    {'q': 'timeout AND NOT healthcheck'},
+    {'q': r'/request \d+7$/'},
+    {'level': 'ERROR'},
+    {'level': 'WARN,ERROR', 'search': 'upstream'},
+    {'start': '2026-10-01T10:50'},
+    {'start': '2026-10-01T09:30', 'search': 'timeout'},
+    {'start': '2026-10-01T10:10', 'end': '2026-10-01T10:20', 'level': 'WARN'},
+    {'context': '3', 'search': 'timeout'},
+    {'format': 'compact', 'q': 'healthcheck'},
+    {'format': 'binary', 'level': 'ERROR'},
+    {'collapse': '1'},
+    {'limit': '200'},
+    {'limit': '500', 'search': 'timeout'},
+    {'limit': '300', 'direction': 'newer'},
+    {'limit': '100', 'at': '2026-10-01T10:40'},
+    {'limit': '50', 'context': '2', 'q': 'timeout'},
+    {'limit': '100', 'start': '2026-10-01T10:30', 'level': 'ERROR'},
+    {'limit': '150', 'format': 'compact', 'search': 'request'},
+)
+
+
+def write_lines(path, start, count, mode='w'):
+    """Linhas com níveis variados, algumas coloridas com ANSI, um segundo entre cada uma."""
+    with open(path, mode) as f:
+        for number in range(count):
+            timestamp = (start + timedelta(seconds=number)).strftime('%Y-%m-%d %H:%M:%S')
+            if number % 11 == 0:
+                level, message = '\x1b[31mERROR\x1b[39m', 'upstream timeout'
+            elif number % 5 == 0:
+                level, message = 'WARN', 'slow upstream'
+            elif number % 3 == 0:
+                level, message = 'HTTP', 'GET /healthcheck timeout=5'
+            else:
+                level, message = 'INFO', 'request'
+            f.write(f"{timestamp} {level} {message} {number}\n")
+
+
+class CachedResponsesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        write_lines(self.path(ROTATED), datetime(2026, 10, 1, 9), 600)
+        write_lines(self.path(CURRENT), datetime(2026, 10, 1, 10), 4000)
+
+        self.cache = TailCache(64 * 1024 * 1024, BUFFER_BYTES, 0, [self.path(CURRENT)], server.clean_log_line)
+        patch = mock.patch.object(server, 'LOG_DIR', self.directory)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        self.httpd = HTTPServer(('127.0.0.1', 0), QuietLogServer)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.addCleanup(self.httpd.server_close)
+        self.addCleanup(self.httpd.shutdown)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def fetch(self, cache, params):
+        query = urllib.parse.urlencode(params)
+        with mock.patch.object(server, 'tail_cache', cache):
+            with urllib.request.urlopen(f"http://127.0.0.1:{self.httpd.server_port}/file/{CURRENT}?{query}") as response:
+                return response.read()
+
+    def assert_cache_in_use(self):
+        self.cache.maintain()
+        snapshot = self.cache.lookup(LogStream(self.path(CURRENT)))
+        self.assertIsNotNone(snapshot)
+        self.assertGreater(snapshot.start, 0)
+
+    def assert_same_responses(self):
+        self.assert_cache_in_use()
+        for params in PARAMS:
+            with self.subTest(params=params):
+                cached = self.fetch(self.cache, params)
+                self.assertEqual(cached, self.fetch(None, params))
+                if 'limit' in params:
+                    self.assert_same_pages(params, json.loads(cached))
+
+    def assert_same_pages(self, params, first):
+        """Segue os cursores da primeira página nas duas direções, comparando cada página."""
+        for direction, key in (('older', 'older'), ('newer', 'newer')):
+            page = first
+            for _ in range(MAX_PAGES):
+                if not page[key]:
+                    break
+                follow = dict(params, cursor=page[key], direction=direction)
+                follow.pop('at', None)
+                cached = self.fetch(self.cache, follow)
+                self.assertEqual(cached, self.fetch(None, follow), follow)
+                page = json.loads(cached)
+
+    def test_same_responses(self):
+        self.assert_same_responses()
+
+    def test_same_responses_after_append(self):
+        self.assert_cache_in_use()
+        write_lines(self.path(CURRENT), datetime(2026, 10, 1, 11, 10), 300, mode='a')
+        self.assert_same_responses()
+
+    def test_same_responses_after_copy_truncate(self):
+        self.assert_cache_in_use()
+        shutil.copyfile(self.path(CURRENT), self.path(ROTATED_LATER))
+        with open(self.path(CURRENT), 'r+') as f:
+            f.truncate(0)
+        write_lines(self.path(CURRENT), datetime(2026, 10, 1, 12), 3000, mode='a')
+        self.assert_same_responses()
+
+    def test_same_responses_after_rename_rotation(self):
+        self.assert_cache_in_use()
+        os.rename(self.path(CURRENT), self.path(ROTATED_LATER))
+        write_lines(self.path(CURRENT), datetime(2026, 10, 1, 12), 3000)
+        self.assert_same_responses()
+
+
+if __name__ == '__main__':
+    unittest.main()
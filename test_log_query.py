@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Testes da linguagem de consulta (log_query.py): o plano compilado, com os
+pré-filtros de literal extraídos das regex, deve aceitar exatamente as mesmas
+linhas que re.search.
+Execute com: python -m unittest test_log_query
+"""
+import re
+import unittest
+
+from log_query import compile_plan, literal_runs
+
+PATTERNS = (
+    r'user_id=\d+', r'\d+ took \d{4,}ms', r'[0-9a-f]{16} from queue',
+    r'\x41BC', r'ABC', r'\U00000041BC', r'\101BC', r'\0BC', r'\N{LATIN CAPITAL LETTER A}BC',
+    r'(a)\1bc', r'(x)(y)(z)(w)(v)(u)(t)(s)(r)(q)\10bc',
+    r'[\]a]bc', r'[]a]bc', r'[^]a]bc', r'[a\]]+bc', r'[\\]bc',
+    r'ab?cd', r'ab*cd', r'ab+cd', r'ab{0}cd', r'ab{2}cd', r'a\.?bc', r'x\d?yz',
+    r'(err|warn)ing', r'timeout|reset', r'foo\|bar', r'^start', r'end$', r'a.c',
+    r'\bword\b', r'(?i)CASE', r'caf\xe9', r'\tTAB',
+)
+LINES = (
+    'user_id=42 ok', 'job 7 took 12345ms', '0123456789abcdef from queue',
+    'xx ABC yy', 'xx 41BC yy', 'x \x00BC', 'aabc', 'xyzwvutsrqxbc', 'xyzwvutsrqx0bc',
+    'x ]bc', 'x abc', 'x bc', 'x zbc', 'x a]]bc', 'x \\bc',
+    'acd', 'abcd', 'abbbcd', 'acd abbcd', 'abc', 'a.bc', 'xyz', 'x1yz',
+    'warning', 'erring', 'timeout', 'reset', 'foo|bar', 'start here', 'the end',
+    'abc', 'a word here', 'case', 'café', '\tTAB', 'nada',
+)
+
+
+class RegexPrefilterTest(unittest.TestCase):
+
+    def assert_same_as_re(self, pattern, flags=''):
+        plan = compile_plan(f'/{pattern}/{flags}')
+        regex = re.compile(pattern, re.IGNORECASE if flags else 0)
+        for line in LINES:
+            with self.subTest(pattern=pattern, flags=flags, line=line):
+                expected = regex.search(line) is not None
+                self.assertEqual(plan.matches(line.encode()), expected, plan.describe())
+
+    def test_matches_re_search(self):
+        for pattern in PATTERNS:
+            self.assert_same_as_re(pattern)
+
+    def test_matches_re_search_ignore_case(self):
+        for pattern in PATTERNS:
+            if '(?' not in pattern:
+                self.assert_same_as_re(pattern, 'i')
+
+    def test_numeric_escapes_are_not_literals(self):
+        self.assertNotIn('41BC', literal_runs(r'\x41BC'))
+        self.assertEqual(max(literal_runs(r'\x41BC'), key=len), 'BC')
+        self.assertEqual(max(literal_runs(r'(a)\1bc'), key=len), 'bc')
+
+    def test_class_with_escaped_bracket(self):
+        self.assertEqual(max(literal_runs(r'[\]a]bc'), key=len), 'bc')
+        self.assertEqual(max(literal_runs(r'[]a]bc'), key=len), 'bc')
+
+    def test_unterminated_class_skips_prefilter(self):
+        self.assertEqual(literal_runs(r'ab[cd'), [''])
+
+
+class LevelTermTest(unittest.TestCase):
+
+    def test_empty_level_is_rejected(self):
+        for query in ('level:""', 'level:,', 'timeout level:" "'):
+            with self.subTest(query=query):
+                with self.assertRaises(ValueError):
+                    compile_plan(query)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Testes dos streams com rotação (log_stream.py) através da paginação de /file/:
+cursores de página e de /context/ que sobrevivem a rotações por renomeação e
+por cópia e truncamento, e start= pulando os arquivos rotacionados antigos
+também com limit=, e páginas que terminam no fim do stream sem cursor para
+uma página vazia.
+Execute com: python -m unittest test_log_stream
+"""
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import HTTPServer
+from unittest import mock
+
+import log_stream
+import server
+
+CURRENT = 'app-out.log'
+ROTATED = 'app-out__2026-10-01_00-00-00.log'
+
+
+class QuietLogServer(server.LogServer):
+    def log_message(self, format, *args):
+        pass
+
+
+def write_lines(path, hour, count, prefix='line', mode='w'):
+    with open(path, mode) as f:
+        for number in range(count):
+            f.write(f"2026-10-01 {hour:02d}:{number // 60 % 60:02d}:{number % 60:02d} INFO {prefix} {number}\n")
+
+
+class LogStreamTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        patches = [mock.patch.object(server, 'LOG_DIR', self.directory),
+                   mock.patch.object(server, 'tail_cache', None)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.httpd = HTTPServer(('127.0.0.1', 0), QuietLogServer)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.addCleanup(self.httpd.server_close)
+        self.addCleanup(self.httpd.shutdown)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def get(self, url, **params):
+        query = urllib.parse.urlencode(params)
+        with urllib.request.urlopen(f"http://127.0.0.1:{self.httpd.server_port}{url}?{query}") as response:
+            return json.loads(response.read())
+
+    def get_error(self, url, **params):
+        with self.assertRaises(urllib.error.HTTPError) as raised:
+            self.get(url, **params)
+        return raised.exception.code, json.loads(raised.exception.read())
+
+
+class StartSkipsRotatedFilesTest(LogStreamTestCase):
+
+    def test_paged_query_does_not_open_old_rotated_files(self):
+        for day in range(1, 4):
+            write_lines(self.path(f'app-out__2026-09-0{day}_00-00-00.log'), 8, 500, 'old')
+        write_lines(self.path(CURRENT), 9, 500)
+        write_lines(self.path(CURRENT), 11, 500, mode='a')
+
+        opened = []
+        real_open = open
+
+        def tracking_open(path, *args, **kwargs):
+            opened.append(os.path.basename(path))
+            return real_open(path, *args, **kwargs)
+
+        with mock.patch.object(log_stream, 'open', tracking_open, create=True):
+            page = self.get(f'/file/{CURRENT}', start='2026-10-01T10:00', search='zzz', limit=50)
+
+        self.assertEqual(page['lines'], [])
+        self.assertIsNone(page['older'])
+        self.assertEqual(set(opened), {CURRENT})
+
+    def test_paged_query_still_reads_rotated_files_in_range(self):
+        write_lines(self.path(ROTATED), 10, 100, 'rotated')
+        write_lines(self.path(CURRENT), 11, 10)
+        page = self.get(f'/file/{CURRENT}', start='2026-10-01T10:00', search='rotated 99', limit=50)
+        self.assertEqual(len(page['lines']), 1)
+
+
+class CursorRotationTest(LogStreamTestCase):
+
+    def setUp(self):
+        super().setUp()
+        write_lines(self.path(CURRENT), 10, 200)
+        first = self.get(f'/file/{CURRENT}', limit=50)
+        self.assertEqual(first['lines'][-1].split()[-1], '150')
+        self.cursor = first['older']
+        self.expected = self.get(f'/file/{CURRENT}', limit=50, cursor=self.cursor)['lines']
+        self.assertEqual(self.expected[0].split()[-1], '149')
+
+    def test_cursor_survives_rename_rotation(self):
+        os.rename(self.path(CURRENT), self.path(ROTATED))
+        write_lines(self.path(CURRENT), 12, 300, 'new')
+        page = self.get(f'/file/{CURRENT}', limit=50, cursor=self.cursor)
+        self.assertEqual(page['lines'], self.expected)
+
+    def test_cursor_survives_copy_truncate(self):
+        shutil.copyfile(self.path(CURRENT), self.path(ROTATED))
+        with open(self.path(CURRENT), 'r+') as f:
+            f.truncate(0)
+        # O arquivo truncado volta a crescer além do offset do cursor
+        write_lines(self.path(CURRENT), 12, 300, 'new', mode='a')
+        page = self.get(f'/file/{CURRENT}', limit=50, cursor=self.cursor)
+        self.assertEqual(page['lines'], self.expected)
+
+    def test_cursor_expires_when_content_is_gone(self):
+        with open(self.path(CURRENT), 'r+') as f:
+            f.truncate(0)
+        write_lines(self.path(CURRENT), 12, 300, 'new', mode='a')
+        status, error = self.get_error(f'/file/{CURRENT}', limit=50, cursor=self.cursor)
+        self.assertEqual(status, 400)
+        self.assertIn('Cursor expirado', error['error'])
+
+
+class PageBoundaryTest(LogStreamTestCase):
+
+    def setUp(self):
+        super().setUp()
+        write_lines(self.path(CURRENT), 10, 100)
+
+    def test_full_last_older_page_has_no_older_cursor(self):
+        first = self.get(f'/file/{CURRENT}', limit=50)
+        self.assertIsNone(first['newer'])
+        last = self.get(f'/file/{CURRENT}', limit=50, cursor=first['older'])
+        self.assertEqual(last['lines'][-1].split()[-1], '0')
+        self.assertIsNone(last['older'])
+        self.assertIsNotNone(last['newer'])
+
+    def test_full_last_newer_page_has_no_newer_cursor(self):
+        first = self.get(f'/file/{CURRENT}', limit=50, direction='newer')
+        self.assertIsNone(first['older'])
+        last = self.get(f'/file/{CURRENT}', limit=50, direction='newer', cursor=first['newer'])
+        self.assertEqual(last['lines'][0].split()[-1], '99')
+        self.assertIsNone(last['newer'])
+        self.assertIsNotNone(last['older'])
+
+    def test_full_page_keeps_cursor_when_lines_remain(self):
+        write_lines(self.path(CURRENT), 11, 1, 'extra', mode='a')
+        first = self.get(f'/file/{CURRENT}', limit=50, direction='newer')
+        last = self.get(f'/file/{CURRENT}', limit=50, direction='newer', cursor=first['newer'])
+        self.assertIsNotNone(last['newer'])
+        rest = self.get(f'/file/{CURRENT}', limit=50, direction='newer', cursor=last['newer'])
+        self.assertEqual(rest['lines'], ['2026-10-01 11:00:00 INFO extra 0'])
+        self.assertIsNone(rest['newer'])
+
+
+class ContextCursorTest(LogStreamTestCase):
+
+    def setUp(self):
+        super().setUp()
+        write_lines(self.path(CURRENT), 10, 200)
+        page = self.get(f'/file/{CURRENT}', search='line 100', context=2, limit=1)
+        self.group = page['groups'][0]
+        self.assertEqual([line['text'].split()[-1] for line in self.group['lines']], ['98', '99', '100', '101', '102'])
+
+    def expand_after(self):
+        return self.get(f'/context/{CURRENT}', cursor=self.group['end_cursor'], before=0, after=3)
+
+    def test_context_expands_from_group_cursors(self):
+        before = self.get(f'/context/{CURRENT}', cursor=self.group['start_cursor'], before=3, after=0)
+        self.assertEqual([line['text'].split()[-1] for line in before['lines']], ['95', '96', '97'])
+        after = self.expand_after()
+        self.assertEqual([line['text'].split()[-1] for line in after['lines']], ['103', '104', '105'])
+        # Os novos cursores continuam a expansão
+        more = self.get(f'/context/{CURRENT}', cursor=after['end_cursor'], before=0, after=1)
+        self.assertEqual(more['lines'][0]['text'].split()[-1], '106')
+
+    def test_context_follows_rename_rotation(self):
+        os.rename(self.path(CURRENT), self.path(ROTATED))
+        write_lines(self.path(CURRENT), 12, 300, 'new')
+        after = self.expand_after()
+        self.assertEqual(after['file'], ROTATED)
+        self.assertEqual([line['text'].split()[-1] for line in after['lines']], ['103', '104', '105'])
+
+    def test_context_follows_copy_truncate(self):
+        shutil.copyfile(self.path(CURRENT), self.path(ROTATED))
+        with open(self.path(CURRENT), 'r+') as f:
+            f.truncate(0)
+        write_lines(self.path(CURRENT), 12, 300, 'new', mode='a')
+        after = self.expand_after()
+        self.assertEqual(after['file'], ROTATED)
+        self.assertEqual([line['text'].split()[-1] for line in after['lines']], ['103', '104', '105'])
+
+    def test_context_rejects_cursor_of_replaced_content(self):
+        with open(self.path(CURRENT), 'r+') as f:
+            f.truncate(0)
+        write_lines(self.path(CURRENT), 12, 300, 'new', mode='a')
+        status, error = self.get_error(f'/context/{CURRENT}', cursor=self.group['end_cursor'], before=0, after=3)
+        self.assertEqual(status, 400)
+        self.assertIn('Cursor expirado', error['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Testes do formato compacto de /file/ (log_wire.py): os epochs de `ts` não
+dependem do fuso do servidor e cada linha é reconstruída sem perda.
+Execute com: python -m unittest test_log_wire
+"""
+import os
+import time
+import unittest
+from datetime import datetime, timezone
+
+from log_time import format_timestamp
+from log_wire import TIMESTAMP_PLACEHOLDER, encode_compact
+
+LINES = (
+    '[01-01-2024 10:00:00] INFO user 42 logged in',
+    '1/1/2024 10:00:00 AM ERROR upstream timeout',
+    'Mon, 01 Jan 2024 10:00:00 GMT WARN slow request',
+    'api | 2024-01-01 10:00:00 DEBUG cache miss',
+    '{"time": 1704103200000, "msg": "metrics"}',
+    'sem timestamp nem nível',
+)
+
+
+class CompactFormatTest(unittest.TestCase):
+
+    def setUp(self):
+        # Fuso padrão do compose.yml, diferente de UTC
+        self.previous_tz = os.environ.get('TZ')
+        os.environ['TZ'] = 'America/Sao_Paulo'
+        time.tzset()
+
+    def tearDown(self):
+        if self.previous_tz is None:
+            del os.environ['TZ']
+        else:
+            os.environ['TZ'] = self.previous_tz
+        time.tzset()
+
+    def test_epoch_is_the_written_time_as_utc(self):
+        data = encode_compact(LINES)
+        written = int(datetime(2024, 1, 1, 10, tzinfo=timezone.utc).timestamp())
+        self.assertEqual(data['ts'], [written] * 4 + [None, None])
+
+    def test_lines_are_rebuilt_without_loss(self):
+        data = encode_compact(LINES)
+        for index, line in enumerate(LINES):
+            head, format_index = data['heads'][data['head'][index]]
+            if format_index is not None:
+                timestamp = datetime.fromtimestamp(data['ts'][index], timezone.utc).replace(tzinfo=None)
+                head = head.replace(TIMESTAMP_PLACEHOLDER, format_timestamp(timestamp, format_index))
+            self.assertEqual(head + data['msg'][index], line)
+
+
+if __name__ == '__main__':
+    unittest.main()